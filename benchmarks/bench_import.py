@@ -0,0 +1,93 @@
+"""Measure the import time of the visualnoobs modules loaded by the HDA.
+
+Usage:
+    hython benchmarks/bench_import.py --repeat 5
+
+Each module is imported at a new interpreter, like a new Houdini session,
+and the script fails if a module loads a heavy SDK at import time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+VISUALNOOBS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "..", "otls", "visualnoobs")
+
+# Modules imported by the PythonModule of the HDA
+MODULES = [
+    "discordNotifier",
+    "driveConnections",
+    "flowConnections",
+    "houdiniParameters",
+    "houdiniPublisher",
+    "publishPipeline",
+]
+
+# SDKs that must load only when their code path runs for first time
+HEAVY_MODULES = [
+    "requests",
+    "shotgun_api3",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.oauth2",
+]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module, repeat):
+    """Imports a module at new interpreters.
+
+    :param module: Name of the module.
+    :param repeat: Number of imports.
+    :return: Tuple with the best time in seconds and the heavy modules loaded.
+    :rtype: tuple
+    """
+
+    code = PROBE.format(path=VISUALNOOBS, module=module, heavy=HEAVY_MODULES)
+    times = []
+    heavy = []
+
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        heavy = result["heavy"]
+
+    return min(times), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Imports of each module, the best one is shown.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    total = 0.0
+
+    for module in MODULES:
+        seconds, heavy = measure(module, args.repeat)
+        total += seconds
+        loaded = f"  loads {', '.join(heavy)}" if heavy else ""
+        print(f"{module:<20} {seconds * 1000:8.1f} ms{loaded}")
+        failed = failed or bool(heavy)
+
+    print(f"{'total':<20} {total * 1000:8.1f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
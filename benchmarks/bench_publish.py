@@ -0,0 +1,208 @@
+"""Benchmark the menu refresh and the publish against local fakes.
+
+Usage:
+    python benchmarks/bench_publish.py --latency 0.02 --output bench.json
+    python benchmarks/bench_publish.py --baseline bench.json
+
+Flow, Google Drive and Discord are replaced by the stand-ins of fakes.py
+with the configured latency by request. Each scenario reports its
+round-trips and wall time, with a baseline the script fails if a scenario
+needs more round-trips than before.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "otls", "visualnoobs"))
+
+import fakes
+
+import discordNotifier
+import driveConnections
+import flowConnections
+
+
+def bench_menus(site, round_trips):
+    """Menu refresh with an empty local store and with the store filled."""
+
+    results = {}
+    for name in ("menus_cold", "menus_warm"):
+        flowConnections.SESSION_CACHE.invalidate()
+        round_trips.reset()
+
+        start = time.perf_counter()
+        flowConnections.Flow().menu_snapshot()
+        seconds = time.perf_counter() - start
+
+        # The requests of the background sync of the warm refresh count too
+        if flowConnections._REFRESH is not None:
+            flowConnections._REFRESH.join()
+        results[name] = (round_trips.count, seconds)
+
+    return results
+
+
+def bench_asset_types(site, round_trips):
+    """Asset types of the project with the biggest asset table."""
+
+    flowConnections.SESSION_CACHE.invalidate()
+    round_trips.reset()
+
+    start = time.perf_counter()
+    flowConnections.Flow().asset_type(site.entities["Project"][0]["name"])
+
+    return {"asset_types": (round_trips.count, time.perf_counter() - start)}
+
+
+def bench_flow_publish(site, round_trips):
+    """Flow writes of an existing asset, of a new asset and of several
+    assets at once."""
+
+    project = site.entities["Project"][0]["name"]
+    results = {}
+
+    for name, asset in (("flow_existing_asset", "asset000042"),
+                        ("flow_new_asset", "asset_new")):
+        flowConnections.SESSION_CACHE.invalidate()
+        round_trips.reset()
+
+        start = time.perf_counter()
+        flowConnections.UploadToFlow().check_asset_exists(
+            project, asset, 1, "https://drive.google.com/file/d/fake/view")
+        results[name] = (round_trips.count, time.perf_counter() - start)
+
+    # Ten existing assets and ten new ones published together
+    assets = [(f"asset{index:06d}", 2, "https://drive.google.com/file/d/fake/view")
+              for index in range(10)]
+    assets += [(f"asset_batch{index}", 1, "https://drive.google.com/file/d/fake/view")
+               for index in range(10)]
+    flowConnections.SESSION_CACHE.invalidate()
+    round_trips.reset()
+
+    start = time.perf_counter()
+    flowConnections.UploadToFlow().publish_assets(project, assets)
+    results["flow_multi_asset"] = (round_trips.count, time.perf_counter() - start)
+
+    return results
+
+
+def bench_drive(drive, round_trips, cache_path):
+    """Folder resolution and upload of a cache with a file by frame."""
+
+    project_id = drive.add_folder("PRJ001")
+    drive.add_folder("assets", project_id)
+    results = {}
+
+    g = driveConnections.GoogleDrive()
+
+    round_trips.reset()
+    start = time.perf_counter()
+    assets_id = g.resolve_folder("PRJ001/assets")
+    results["drive_resolve_folder"] = (round_trips.count,
+                                       time.perf_counter() - start)
+
+    round_trips.reset()
+    start = time.perf_counter()
+    folder_id = g.upload_folder(cache_path, assets_id)
+    g.share_link(folder_id)
+    results["drive_upload_folder"] = (round_trips.count,
+                                      time.perf_counter() - start)
+
+    round_trips.reset()
+    start = time.perf_counter()
+    g.upload_folder(cache_path, assets_id, previous_id=folder_id)
+    results["drive_upload_unchanged"] = (round_trips.count,
+                                         time.perf_counter() - start)
+
+    return results
+
+
+def bench_discord(round_trips, messages):
+    """Burst of publish notifications."""
+
+    notify = discordNotifier.DiscordConnections()
+    round_trips.reset()
+
+    start = time.perf_counter()
+    for index in range(messages):
+        notify.flipbok_notifier(notify.notify_asset_message(f"asset{index}_v001"))
+    discordNotifier.SENDER.flush()
+
+    return {"discord_burst": (round_trips.count, time.perf_counter() - start)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Seconds of each request to the fakes.")
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--assets", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=5000,
+                        help="Files of the VDB cache folder.")
+    parser.add_argument("--messages", type=int, default=50,
+                        help="Discord notifications of the burst.")
+    parser.add_argument("--output", help="Json file where save the results.")
+    parser.add_argument("--baseline", help="Json file with previous results.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="visualnoobs_bench_")
+    os.environ["HOUDINI_USER_PREF_DIR"] = workdir
+    os.environ.setdefault("FLOW_USER", "artist@studio.com")
+    os.environ.setdefault("DISCORD_CHANNEL", "1")
+    os.environ.setdefault("DISCORD_USER", "bench")
+    os.environ.setdefault("DISCORD_TOKEN_BOT", "bench")
+
+    flow_trips = fakes.RoundTrips(args.latency)
+    site = fakes.FakeShotgun(flow_trips, args.projects, args.tasks, args.assets,
+                             os.environ["FLOW_USER"])
+    flowConnections.CLIENT_POOL.factory = lambda: site
+
+    drive_trips = fakes.RoundTrips(args.latency)
+    drive = fakes.FakeDrive(drive_trips)
+    driveConnections.use_service_factory(drive.service)
+
+    discord_trips = fakes.RoundTrips(args.latency)
+    discord = fakes.FakeDiscord(discord_trips)
+    discordNotifier.DiscordConnections.API_URL = discord.url
+
+    cache_path = os.path.join(workdir, "cache_v001")
+    fakes.make_cache_folder(cache_path, args.files)
+
+    results = {}
+    results.update(bench_menus(site, flow_trips))
+    results.update(bench_asset_types(site, flow_trips))
+    results.update(bench_flow_publish(site, flow_trips))
+    results.update(bench_drive(drive, drive_trips, cache_path))
+    results.update(bench_discord(discord_trips, args.messages))
+    discord.close()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print(f"{'scenario':<26}{'round-trips':>12}{'seconds':>10}")
+    for name, (requests, seconds) in results.items():
+        note = ""
+        if name in baseline and requests > baseline[name]["round_trips"]:
+            regressions += 1
+            note = f"  REGRESSION (was {baseline[name]['round_trips']})"
+        print(f"{name:<26}{requests:>12}{seconds:>10.2f}{note}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({name: {"round_trips": requests, "seconds": seconds}
+                       for name, (requests, seconds) in results.items()},
+                      f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
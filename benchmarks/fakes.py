@@ -0,0 +1,439 @@
+"""Local stand-ins of Flow, Google Drive and Discord for the benchmarks.
+
+Each request to a fake sleeps the configured latency and is counted, so the
+benchmarks report the round-trips and the wall time of the publisher
+without touching the production services.
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RoundTrips:
+    """Counter of the requests sent to a fake service."""
+
+    def __init__(self, latency):
+        """
+        :param latency: Seconds slept by each request.
+        """
+
+        self.latency = latency
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, requests=1):
+        with self._lock:
+            self.count += requests
+
+        time.sleep(self.latency * requests)
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+class FakeShotgun:
+    """In memory Flow site with the queries used by flowConnections.
+
+    A find without limit is counted as one request by page of 500 records,
+    like shotgun_api3 does.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, round_trips, projects=500, tasks=50000, assets=100000,
+                 user="artist@studio.com"):
+        """
+        :param round_trips: RoundTrips of the site.
+        :param projects: Number of projects of the user.
+        :param tasks: Number of tasks of the user split between the projects.
+        :param assets: Number of assets of the first project.
+        :param user: Email of the user.
+        """
+
+        self.round_trips = round_trips
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        updated = datetime.now() - timedelta(days=1)
+        types = ["Model", "Environment", "Camera", "FX", "Character"]
+
+        user_entity = {"type": "HumanUser", "id": 88}
+        self.entities = {
+            "Project": [{"type": "Project", "id": id, "name": f"PRJ{id:03d}"}
+                        for id in range(1, projects + 1)],
+            "Task": [],
+            "Asset": [],
+            "Version": [],
+        }
+        self.entities["HumanUser"] = [dict(user_entity, email=user,
+                                           projects=self.entities["Project"])]
+
+        for index in range(tasks):
+            project = self.entities["Project"][index % projects]
+            shot = f"SQ{index % 20:02d}_{index % 1000:04d}"
+            self.entities["Task"].append({
+                "type": "Task",
+                "id": next(self._ids),
+                "content": f"fx{index % 7}",
+                "entity": {"type": "Shot", "id": index % 1000, "name": shot},
+                "project": project,
+                "task_assignees": [user_entity],
+                "updated_at": updated,
+            })
+
+        project = self.entities["Project"][0]
+        for index in range(assets):
+            self.entities["Asset"].append({
+                "type": "Asset",
+                "id": next(self._ids),
+                "code": f"asset{index:06d}",
+                "project": project,
+                "sg_asset_type": types[index % len(types)],
+            })
+
+    def find(self, entity_type, filters, fields=None, order=None,
+             filter_operator=None, limit=0, retired_only=False, page=0,
+             **kwargs):
+        with self._lock:
+            records = [record for record in self.entities[entity_type]
+                       if bool(record.get("retired")) == retired_only
+                       and self._match(record, filters)]
+
+        if limit:
+            start = (max(page, 1) - 1) * limit
+            records = records[start:start + limit]
+            self.round_trips()
+        else:
+            self.round_trips(max(1, -(-len(records) // self.PAGE_SIZE)))
+
+        return [self._fields(record, fields) for record in records]
+
+    def find_one(self, entity_type, filters, fields=None, **kwargs):
+        records = self.find(entity_type, filters, fields, limit=1, page=1)
+
+        return records[0] if records else None
+
+    def summarize(self, entity_type, filters, summary_fields, grouping=None,
+                  **kwargs):
+        self.round_trips()
+        field = grouping[0]["field"]
+
+        with self._lock:
+            counts = {}
+            for record in self.entities[entity_type]:
+                if not record.get("retired") and self._match(record, filters):
+                    counts[record.get(field)] = counts.get(record.get(field), 0) + 1
+
+        groups = [{"group_name": name, "group_value": name,
+                   "summaries": {"id": count}}
+                  for name, count in sorted(counts.items(), key=str)]
+
+        return {"groups": groups, "summaries": {"id": sum(counts.values())}}
+
+    def create(self, entity_type, data, return_fields=None):
+        self.round_trips()
+
+        return self._create(entity_type, data)
+
+    def batch(self, requests):
+        self.round_trips()
+
+        return [self._create(request["entity_type"], request["data"])
+                for request in requests]
+
+    def upload(self, entity_type, entity_id, path, field_name=None, **kwargs):
+        self.round_trips()
+
+    def _create(self, entity_type, data):
+        record = dict(data, type=entity_type, id=next(self._ids),
+                      updated_at=datetime.now())
+        with self._lock:
+            self.entities[entity_type].append(record)
+
+        return {"type": entity_type, "id": record["id"]}
+
+    @staticmethod
+    def _fields(record, fields):
+        result = {"type": record["type"], "id": record["id"]}
+        for field in fields or []:
+            result[field] = record.get(field)
+
+        return result
+
+    @staticmethod
+    def _match(record, filters):
+        for field, operator, value in filters:
+            current = record.get(field)
+            values = current if isinstance(current, list) else [current]
+
+            if operator == "is" and _key(value) not in map(_key, values):
+                return False
+            if operator == "in" and not _keys(value).intersection(map(_key, values)):
+                return False
+            if operator == "greater_than" and not (current and current > value):
+                return False
+
+        return True
+
+
+def _key(value):
+    # Entities are compared by type and id
+    if isinstance(value, dict):
+        return (value["type"], value["id"])
+
+    return value
+
+
+_KEYS = {}
+
+
+def _keys(values):
+    # Set of keys of an "in" filter, reused between the records of a query
+    cached = _KEYS.get(id(values))
+    if cached is None or cached[0] is not values:
+        cached = _KEYS[id(values)] = (values, {_key(value) for value in values})
+
+    return cached[1]
+
+
+class _FakeRequest:
+    """Request of the fake Drive, it's sent with execute or next_chunk."""
+
+    def __init__(self, drive, action, media=None):
+        self.drive = drive
+        self.action = action
+        self.media = media
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self._in_error_state = False
+
+    def execute(self, num_retries=0):
+        self.drive.round_trips()
+
+        return self.action()
+
+    def next_chunk(self, num_retries=0):
+        self.drive.round_trips()
+        size = self.media.size()
+
+        if self.resumable_uri is None:
+            self.resumable_uri = f"fake://upload/{id(self)}"
+
+        self.resumable_progress = min(size, self.resumable_progress
+                                      + self.media.chunksize())
+        if self.resumable_progress >= size:
+            return None, self.action()
+
+        status = _UploadStatus(self.resumable_progress, size)
+
+        return status, None
+
+
+class _UploadStatus:
+    def __init__(self, resumable_progress, total_size):
+        self.resumable_progress = resumable_progress
+        self.total_size = total_size
+
+
+class _FakeBatch:
+    """Batch of the fake Drive, all its requests are one round-trip."""
+
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id or str(len(self.requests) + 1)
+        self.requests.append((request, callback or self.callback, request_id))
+
+    def execute(self):
+        self.drive.round_trips()
+
+        for request, callback, request_id in self.requests:
+            try:
+                response, error = request.action(), None
+            except Exception as e:
+                response, error = None, e
+            callback(request_id, response, error)
+
+
+class FakeDrive:
+    """In memory Google Drive with the calls used by driveConnections."""
+
+    FOLDER_MIME = "application/vnd.google-apps.folder"
+
+    def __init__(self, round_trips):
+        """
+        :param round_trips: RoundTrips of the Drive.
+        """
+
+        self.round_trips = round_trips
+        self.files = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add_folder(self, name, parent_id=None):
+        """Creates a folder without counting a request.
+
+        :return: The id of the folder.
+        :rtype: str
+        """
+
+        return self._new({"name": name, "mimeType": self.FOLDER_MIME,
+                          "parents": [parent_id] if parent_id else []})["id"]
+
+    def service(self):
+        """Drive service of a thread, used as driveConnections factory."""
+
+        return _FakeService(self)
+
+    def _new(self, body, md5=None):
+        file = dict(body, trashed=False)
+        file.setdefault("id", f"fake{next(self._ids)}")
+        if md5:
+            file["md5Checksum"] = md5
+        with self._lock:
+            self.files[file["id"]] = file
+
+        return {"id": file["id"]}
+
+    def _list(self, query, page_token=None, page_size=100):
+        name = re.search(r"name='((?:[^'\\]|\\.)*)'", query)
+        parent = re.search(r"'([^']+)' in parents", query)
+        folders_only = f"mimeType='{self.FOLDER_MIME}'" in query
+
+        with self._lock:
+            files = [file for file in self.files.values()
+                     if not file["trashed"]
+                     and (not name or file["name"] == name.group(1))
+                     and (not parent or parent.group(1) in file["parents"])
+                     and (not folders_only or file.get("mimeType") == self.FOLDER_MIME)]
+
+        start = int(page_token or 0)
+        result = {"files": files[start:start + page_size]}
+        if start + page_size < len(files):
+            result["nextPageToken"] = str(start + page_size)
+
+        return result
+
+
+class _FakeService:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def files(self):
+        return _FakeFiles(self.drive)
+
+    def permissions(self):
+        return _FakePermissions(self.drive)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self.drive, callback)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q="", fields=None, pageSize=100, pageToken=None, **kwargs):
+        return _FakeRequest(self.drive, lambda: self.drive._list(
+            q, pageToken, pageSize))
+
+    def get(self, fileId, fields=None, **kwargs):
+        def action():
+            if fileId not in self.drive.files:
+                raise LookupError(f"File not found: {fileId}")
+            return dict(self.drive.files[fileId])
+
+        return _FakeRequest(self.drive, action)
+
+    def create(self, body=None, media_body=None, fields=None, **kwargs):
+        def action():
+            md5 = None
+            if media_body is not None:
+                with open(media_body._filename, "rb") as f:
+                    md5 = hashlib.md5(f.read()).hexdigest()
+            return self.drive._new(body, md5)
+
+        return _FakeRequest(self.drive, action, media_body)
+
+    def copy(self, fileId, body=None, fields=None, **kwargs):
+        def action():
+            source = self.drive.files[fileId]
+            return self.drive._new(dict(body), source.get("md5Checksum"))
+
+        return _FakeRequest(self.drive, action)
+
+    def delete(self, fileId, **kwargs):
+        def action():
+            with self.drive._lock:
+                del self.drive.files[fileId]
+            return ""
+
+        return _FakeRequest(self.drive, action)
+
+    def generateIds(self, count=10, **kwargs):
+        return _FakeRequest(self.drive, lambda: {
+            "ids": [f"fake{next(self.drive._ids)}" for _ in range(count)]})
+
+
+class _FakePermissions:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, fileId, body=None, **kwargs):
+        return _FakeRequest(self.drive, lambda: {"id": "anyoneWithLink"})
+
+
+class FakeDiscord:
+    """Local http server that answers like the Discord messages endpoint."""
+
+    def __init__(self, round_trips):
+        """
+        :param round_trips: RoundTrips of the server.
+        """
+
+        self.round_trips = round_trips
+        self.messages = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                fake.round_trips()
+                length = int(self.headers["Content-Length"])
+                fake.messages.append(json.loads(self.rfile.read(length)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def make_cache_folder(path, files, size=4096):
+    """Creates a folder with a file by frame like a VDB cache.
+
+    :param path: Path of the folder.
+    :param files: Number of files.
+    :param size: Bytes of each file.
+    """
+
+    os.makedirs(path, exist_ok=True)
+    for frame in range(1, files + 1):
+        with open(os.path.join(path, f"cache.{frame:04d}.vdb"), "wb") as f:
+            f.write(os.urandom(size))
@@ -1,13 +1,180 @@
-import hou # type: ignore
 import os
-import requests
+import queue
+import threading
+import time
+
+import publishTrace
+
+
+class DiscordSender:
+    """Sends the Discord messages from a background thread with a pooled
+    http session.
+
+    The messages queued at the same time are merged in one digest message
+    and the Discord rate limits are followed instead of losing messages.
+    """
+
+    # Seconds waiting for more messages to merge in the digest
+    DIGEST_WINDOW = 2.0
+    # Max characters of a Discord message
+    MAX_LENGTH = 2000
+    MAX_RETRIES = 5
+    # Seconds waited before the first retry of a network or server error
+    BACKOFF = 1.0
+    # Seconds for connect and read
+    TIMEOUT = (5, 15)
+
+    def __init__(self):
+        self._session = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def session(self):
+        """Http session of the sender, requests is imported the first time a
+        message is sent.
+        """
+        
+        if self._session is None:
+            import requests
+            
+            self._session = requests.Session()
+        
+        return self._session
+
+    def send(self, endpoint, headers, content):
+        """Queues a message for send it at the background.
+
+        :param endpoint: Url of the channel messages.
+        :param headers: Headers with the authorization of the bot.
+        :param content: Message content.
+        """
+
+        self._queue.put((endpoint, headers, content))
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, daemon=True,
+                                                name="DiscordSender")
+                self._thread.start()
+
+    def flush(self):
+        """Waits until all the queued messages are sent."""
+
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # Collects the burst of messages
+            deadline = time.monotonic() + self.DIGEST_WINDOW
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+
+                except queue.Empty:
+                    break
+
+            try:
+                channels = {}
+                for endpoint, headers, content in batch:
+                    channels.setdefault(endpoint, (headers, []))[1].append(content)
+
+                for endpoint, (headers, contents) in channels.items():
+                    for content in self.digest(contents):
+                        self._post(endpoint, headers, content)
+
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def digest(self, contents):
+        """Merges the messages in the less messages possible without exceed
+        the Discord max length.
+
+        :param contents: List with the content of each message.
+        :return: List with the content of the merged messages.
+        :rtype: list
+        """
+
+        messages = []
+        for content in contents:
+            if messages and len(messages[-1]) + len(content) + 1 <= self.MAX_LENGTH:
+                messages[-1] += f"\n{content}"
+            else:
+                messages.append(content)
+
+        return messages
+
+    def _post(self, endpoint, headers, content):
+        import requests
+
+        payload = {
+            "content" : content
+        }
+
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                # POST request
+                with publishTrace.span("discord.post") as span:
+                    span.add(requests=1, bytes=len(content))
+                    response = self.session.post(endpoint, json=payload,
+                                                 headers=headers,
+                                                 timeout=self.TIMEOUT)
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Network errors are retried waiting more each time
+                print(f"Error sending message to Discord, retrying: {e}")
+                time.sleep(self.BACKOFF * 2 ** attempt)
+                continue
+
+            if response.status_code == 429:
+                # Rate limited, waits the time asked by Discord
+                time.sleep(self._retry_after(response))
+                continue
+
+            if response.status_code >= 500:
+                # Discord is failing, retried waiting more each time
+                time.sleep(self.BACKOFF * 2 ** attempt)
+                continue
+
+            try:
+                response.raise_for_status()
+
+            except requests.RequestException as e:
+                print(f"Error sending message to Discord: {e}")
+                return
+
+            # The bucket is empty, waits until it resets
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                time.sleep(float(response.headers.get("X-RateLimit-Reset-After", 0)))
+
+            return
+
+        print("Error sending message to Discord: failed too many times")
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json()["retry_after"])
+
+        except (ValueError, KeyError):
+            return float(response.headers.get("Retry-After", 1))
+
+
+# Shared by all the notifiers of the session
+SENDER = DiscordSender()
 
 
 class DiscordConnections:
-    CHANNEL_ID = os.environ["DISCORD_CHANNEL"]
-    USER_ID = os.environ["DISCORD_USER"]
-    
+    API_URL = "https://discordapp.com/api"
+
     def __init__(self):
+        # Read when the notifier is created, not when the module is imported
+        self.CHANNEL_ID = os.environ["DISCORD_CHANNEL"]
+        self.USER_ID = os.environ["DISCORD_USER"]
         token = os.environ["DISCORD_TOKEN_BOT"]
 
         self.headers = {
@@ -16,24 +183,14 @@ class DiscordConnections:
 
     def flipbok_notifier(self, message):
         """Creates the flipbook upload notification for send it at discord.
+        The message is sent at the background, so it returns immediately.
         
         :param message: Message content for send at the notify.
         """
             
-        endpoint = f"https://discordapp.com/api/channels/{self.CHANNEL_ID}/messages"
-
+        endpoint = f"{self.API_URL}/channels/{self.CHANNEL_ID}/messages"
 
-        payload = {
-            "content" : message
-        }
-
-        try:
-            # POST request
-            response = requests.post(endpoint,json=payload, headers=self.headers)
-            response.raise_for_status()
-            
-        except requests.RequestException as e:
-            print(f"Error sending message to Discord: {e}")
+        SENDER.send(endpoint, self.headers, message)
     
     def notify_message_houdini(self, project, task):        
         """Message and data get from houdini to creates the content of notify.
@@ -1,45 +1,299 @@
 import os
 import io
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
-from googleapiclient.http import MediaFileUpload
+import publishTrace
+import userPrefs
+
+# The Google client libraries are imported when they are used for the first
+# time, they are slow to import and the HDA loads this module on creation
+
+
+class UploadError(Exception):
+    """Raised when some files of a folder couldn't be uploaded."""
+
+    def __init__(self, errors):
+        """
+        :param errors: List of tuples with the file path and its exception.
+        """
+        
+        self.errors = errors
+        files = ", ".join(path for path, _ in errors)
+        super().__init__(f"{len(errors)} files failed to upload: {files}")
+
+
+class StateStore:
+    """Values of the state of the publisher saved at a SQLite database, it
+    survives the Houdini session and it's shared by the hython processes of
+    the batch publish.
+    """
+    
+    DATABASE = "drive.db"
+    
+    def __init__(self, name):
+        """
+        :param name: Name of the group of values like "uploads".
+        """
+        
+        self.name = name
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+    
+    def get(self, key):
+        """Gets a value saved at the store.
+        
+        :param key: Key of the value.
+        :return: The value or None if it isn't saved.
+        """
+        
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM state WHERE name = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+        
+        return json.loads(row[0]) if row else None
+    
+    def set(self, key, value):
+        """Saves a value at the store.
+        
+        :param key: Key of the value.
+        :param value: Value serializable to json.
+        """
+        
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO state (name, key, value) "
+                    "VALUES (?, ?, ?)",
+                    (self.name, key, json.dumps(value)),
+                )
+    
+    def remove(self, key):
+        """Removes a value from the store.
+        
+        :param key: Key of the value.
+        """
+        
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM state WHERE name = ? AND key = ?",
+                           (self.name, key))
+    
+    def discard(self, predicate):
+        """Removes the values that match a condition.
+        
+        :param predicate: Function called with the key and the value that
+        returns True for the values to remove.
+        """
+        
+        with self._lock:
+            db = self._connect()
+            with db:
+                rows = db.execute("SELECT key, value FROM state WHERE name = ?",
+                                  (self.name,)).fetchall()
+                keys = [(self.name, key) for key, value in rows
+                        if predicate(key, json.loads(value))]
+                db.executemany("DELETE FROM state WHERE name = ? AND key = ?",
+                               keys)
+    
+    def _connect(self):
+        # The connections can't be shared with the processes forked
+        if self._db is None or self._pid != os.getpid():
+            path = userPrefs.pref_path(self.DATABASE)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # Waits the writes of the other processes instead of failing
+            self._db = sqlite3.connect(path, check_same_thread=False,
+                                       timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (name, key))"
+            )
+            self._db.commit()
+            self._pid = os.getpid()
+            self._import_json()
+        
+        return self._db
+    
+    def _import_json(self):
+        # Values saved by the json files of the previous versions
+        path = userPrefs.pref_path(f"{self.name}.json")
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO state (name, key, value) "
+                    "VALUES (?, ?, ?)",
+                    [(self.name, key, json.dumps(value))
+                     for key, value in state.items()],
+                )
+            os.remove(path)
+        
+        except (OSError, ValueError) as e:
+            print(f"Error importing {path}: {e}")
+
+
+_AUTH_LOCK = threading.Lock()
+_CREDS = None
+_DISCOVERY = None
+_SERVICES = threading.local()
+_SERVICE_FACTORY = None
+
+
+def use_service_factory(factory):
+    """Builds the Drive services with a factory instead of the Google client
+    and skips the authentication, the benchmarks use it for run offline.
+    
+    :param factory: Function that returns a Drive service, None for use the
+    Google client again.
+    """
+    
+    global _SERVICE_FACTORY, _SERVICES
+    
+    _SERVICE_FACTORY = factory
+    _SERVICES = threading.local()
+
+
+def credentials():
+    """Gets the Google Drive credentials of the process, the token file is
+    read only the first time.
+    
+    :return: The credentials of the user.
+    :rtype: google.oauth2.credentials.Credentials
+    """
+    
+    global _CREDS
+    
+    if _SERVICE_FACTORY is not None:
+        return None
+    
+    with _AUTH_LOCK:
+        if _CREDS is None:
+            _CREDS = _load_credentials()
+    
+    return _CREDS
+
+
+def _load_credentials():
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds = None
+    # Grant Permissions: If modifying these scopes, delete the file token.json.
+    SCOPES = ["https://www.googleapis.com/auth/drive"]
+    token_path = "D:\\HoudiniDev\\houdiniTools\\token.json"
+    cred_path = "D:\\HoudiniDev\\houdiniTools\\credentials.json"
+
+    # The file token.json stores the user's access and refresh tokens, and is
+    # created automatically when the authorization flow completes for the first
+    # time.
+    if os.path.exists(token_path):
+        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+
+    # With a refresh token the transport refreshes the access token before
+    # the first request after it expires, no need to do it now
+    if creds and (creds.valid or creds.refresh_token):
+        return creds
+
+    # If there are no (valid) credentials available, let the user log in.
+    flow = InstalledAppFlow.from_client_secrets_file(
+    cred_path, SCOPES
+    )
+    creds = flow.run_local_server(port=0)
+    # Save the credentials for the next run
+    with open(token_path, "w") as token:
+        token.write(creds.to_json())
+    
+    return creds
+
+
+def drive_service():
+    """Gets the Drive service of the current thread, it's built the first
+    time from the discovery document bundled with the client library and
+    the next services reuse the document already parsed.
+    
+    :return: The Drive v3 service.
+    :rtype: googleapiclient.discovery.Resource
+    """
+    
+    global _DISCOVERY
+    
+    service = getattr(_SERVICES, "service", None)
+    if service is not None:
+        return service
+    
+    if _SERVICE_FACTORY is not None:
+        service = _SERVICES.service = _SERVICE_FACTORY()
+        return service
+    
+    from googleapiclient.discovery import build, build_from_document
+    
+    creds = credentials()
+    with _AUTH_LOCK:
+        if _DISCOVERY is None:
+            # Log in client 
+            service = build("drive", "v3", credentials=creds,
+                            static_discovery=True)
+            _DISCOVERY = service._rootDesc
+    
+    if service is None:
+        service = build_from_document(_DISCOVERY, credentials=creds)
+    
+    _SERVICES.service = service
+    
+    return service
 
 
 class GoogleDrive:
+    # Files uploaded at the same time by upload_folder
+    UPLOAD_WORKERS = 8
+    # Bytes sent by request at the uploads, must be multiple of 256 KB
+    CHUNK_SIZE = 32 * 1024 * 1024
+    NUM_RETRIES = 3
+    # Requests sent by http request at the batch endpoint, the Drive limit
+    BATCH_SIZE = 100
+    # Http status of the batched requests that are sent again, a 403 only
+    # with a rate limit reason
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+    # Ids returned by a generateIds request
+    GENERATE_IDS_LIMIT = 1000
+    FOLDER_MIME = "application/vnd.google-apps.folder"
+    # Resumable upload sessions, so an upload interrupted by a crash continues
+    # from the last byte committed to Drive
+    SESSIONS = StateStore("uploads")
+    # Folder ids by "parent_id/name", "/name" for the folders searched by name
+    FOLDERS = StateStore("folders")
+    # Folder ids of the disk checked at Drive by this session
+    _CHECKED = set()
+
     def __init__(self):
-        """Authenticate with Google Drive using the credentials json file."""
-        self.creds = None
-        # Grant Permissions: If modifying these scopes, delete the file token.json.
-        SCOPES = ["https://www.googleapis.com/auth/drive"]
-        token_path = "D:\\HoudiniDev\\houdiniTools\\token.json"
-        cred_path = "D:\\HoudiniDev\\houdiniTools\\credentials.json"
-
-        # The file token.json stores the user's access and refresh tokens, and is
-        # created automatically when the authorization flow completes for the first
-        # time.
-        if os.path.exists(token_path):
-            self.creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-
-        # If there are no (valid) credentials available, let the user log in.
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                self.creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                cred_path, SCOPES
-                )
-                self.creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-            with open(token_path, "w") as token:
-                token.write(self.creds.to_json())
+        """Authenticate with Google Drive using the credentials json file.
+        The credentials and the services are shared by all the instances."""
+        self.creds = credentials()
 
-        # Log in client 
-        self.service = build("drive", "v3", credentials=self.creds)
+    @property
+    def service(self):
+        """Drive service of the current thread, the http transport of a
+        service can't be shared between threads.
+        """
+        
+        return drive_service()
 
     def folder_project_id(self, project):
         """Gets the id of the project folder from Google Drive.
@@ -49,18 +303,8 @@ class GoogleDrive:
         :rtype: str
         """
         
-        query = f"name='{project}'"
-
-        # Call the Drive v3 API
-        results = (
-            self.service.files()
-            .list(q=query, fields="nextPageToken, files(id, name)")
-            .execute()
-        )
-        items = results.get("files", [])[0]["id"]
-        
         # "127763ygaqshjvajsayfs651gv"        
-        return items
+        return self.resolve_folder(project)
 
     def folder_assets_id(self, parent_id, folder_name):
         """Gets the id of the assets folder from Google Drive.
@@ -71,12 +315,88 @@ class GoogleDrive:
         :rtype: str
         """
         
-        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents"
-        result = self.service.files().list(q=query, fields="files(id, name)").execute()
+        # "127763ygaqshjvajsayfs651gv"     
+        return self.resolve_folder(folder_name, parent_id)
+    
+    def resolve_folder(self, path, parent_id=None):
+        """Gets the id of a folder by its path like "EPF/assets".
+        
+        The ids are saved at disk, so a path resolved before costs no request.
+        When a folder isn't found under a saved parent, the parent is checked
+        and the path is resolved again if the parent doesn't exist anymore.
+        A path read completely from disk is checked once by session, the
+        folder could be trashed or created again since it was saved.
+        
+        :param path: Folder names separated by "/".
+        :param parent_id: Id of the folder where the path starts, None for
+        search the first folder by name at all the Drive.
+        :return: The id of the last folder of the path.
+        :rtype: str
+        """
+        
+        folder_id = parent_id
+        cached = True
+        
+        for name in [name for name in path.split("/") if name]:
+            key = f"{folder_id or ''}/{name}"
+            child_id = self.FOLDERS.get(key)
+            
+            if child_id is None:
+                child_id = self._find_folder(name, folder_id)
+                
+                if child_id is None:
+                    # A saved parent could be deleted or moved to the trash
+                    if folder_id != parent_id and cached and not self._folder_exists(folder_id):
+                        self._forget_folder(folder_id)
+                        return self.resolve_folder(path, parent_id)
+                    
+                    raise FileNotFoundError(f"Drive folder not found: {path}")
+                
+                self.FOLDERS.set(key, child_id)
+                cached = False
+            
+            folder_id = child_id
+        
+        if cached and folder_id != parent_id and folder_id not in self._CHECKED:
+            if not self._folder_exists(folder_id):
+                self._forget_folder(folder_id)
+                return self.resolve_folder(path, parent_id)
+            
+            self._CHECKED.add(folder_id)
+        
+        # "127763ygaqshjvajsayfs651gv"
+        return folder_id
+    
+    def _find_folder(self, name, parent_id):
+        name = name.replace("\\", "\\\\").replace("'", "\\'")
+        query = (f"name='{name}' and mimeType='{self.FOLDER_MIME}' "
+                 f"and trashed=false")
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        
+        request = self.service.files().list(q=query, fields="files(id)",
+                                            pageSize=1)
+        result = self._execute(request, "find_folder")
         folders = result.get("files", [])
         
-        # "127763ygaqshjvajsayfs651gv"     
-        return folders[0]["id"]      
+        return folders[0]["id"] if folders else None
+    
+    def _folder_exists(self, folder_id):
+        from googleapiclient.errors import HttpError
+        
+        try:
+            request = self.service.files().get(fileId=folder_id,
+                                               fields="trashed")
+            folder = self._execute(request, "folder_exists")
+        
+        except HttpError:
+            return False
+        
+        return not folder.get("trashed")
+    
+    def _forget_folder(self, folder_id):
+        self.FOLDERS.discard(
+            lambda key, id: id == folder_id or key.startswith(f"{folder_id}/"))
     
     def create_folder(self, folder_name, assets_folder_id):        
         """Creates a folder in Google Drive and returns its ID.
@@ -87,62 +407,465 @@ class GoogleDrive:
         :rtype: str
         """
         
+        folder = self._execute(
+            self._folder_request(folder_name, assets_folder_id),
+            "create_folder"
+        )
+        
+        # "127763ygaqshjvajsayfs651gv"
+        return folder["id"]
+    
+    def create_folders(self, folder_path, parent_id):
+        """Creates a folder at Google Drive mirroring a local folder and all
+        its subfolders. The subfolders of each level of the tree are created
+        together with batch requests.
+        
+        :param folder_path: Path of the local folder.
+        :param parent_id: Id of the parent folder.
+        :return: Dictionary with the local path and the id of each folder.
+        :rtype: dict
+        """
+        
+        children = {}
+        for root, dirs, _ in os.walk(folder_path):
+            children[root] = [os.path.join(root, name) for name in sorted(dirs)]
+        
+        folder_ids = {folder_path: self.create_folder(
+            os.path.basename(folder_path), parent_id)}
+        
+        # The ids are chosen before the creates, so a retry can't duplicate
+        # a folder
+        subfolders = [path for paths in children.values() for path in paths]
+        folder_ids.update(zip(subfolders, self.generate_ids(len(subfolders))))
+        level = children[folder_path]
+        
+        # A folder is created after its parent, so a batch by level
+        while level:
+            requests = {
+                path: self._folder_request(os.path.basename(path),
+                                           folder_ids[os.path.dirname(path)],
+                                           folder_ids[path])
+                for path in level
+            }
+            self.execute_batch(requests, "create_folders")
+            
+            level = [child for path in level for child in children[path]]
+        
+        # {"D:/cache/smoke_v004": "127763ygaqshjvajsayfs651gv"}
+        return folder_ids
+    
+    def _folder_request(self, folder_name, parent_id, folder_id=None):
         file_metadata = {
             "name": folder_name,
-            "mimeType": "application/vnd.google-apps.folder",
-            "parents": [assets_folder_id]
+            "mimeType": self.FOLDER_MIME,
+            "parents": [parent_id]
         }
+        if folder_id:
+            file_metadata["id"] = folder_id
         
-        folder = (
-            self.service.files()
-            .create(body=file_metadata, fields="id")
-            .execute()
-        )
+        return self.service.files().create(body=file_metadata, fields="id")
+    
+    def execute_batch(self, requests, name):
+        """Sends several metadata requests of the Drive API together with the
+        batch endpoint, up to BATCH_SIZE requests by http request. The
+        requests failed by the rate limit, a server error or a network error
+        are sent again, the creates must carry an id from generate_ids so a
+        retry of a create already applied fails with 409 instead of
+        duplicating it, that 409 is taken as done with a None response.
         
-        # "127763ygaqshjvajsayfs651gv"
-        return folder["id"]
+        :param requests: Dictionary with a key chosen by the caller and the
+        request of the Drive API.
+        :param name: Name of the operation for the trace like "copy_files".
+        :return: Dictionary with the key and the response of each request.
+        :rtype: dict
+        :raises UploadError: If some requests failed, with their keys.
+        """
+        
+        from googleapiclient.errors import HttpError
+        
+        responses = {}
+        failed = {}
+        pending = dict(requests)
+        
+        for attempt in range(self.NUM_RETRIES + 1):
+            errors = {}
+            keys = list(pending)
+            
+            for start in range(0, len(keys), self.BATCH_SIZE):
+                chunk = keys[start:start + self.BATCH_SIZE]
+                
+                def callback(request_id, response, exception, chunk=chunk):
+                    key = chunk[int(request_id)]
+                    if exception is None:
+                        responses[key] = response
+                        publishTrace.add(bytes=publishTrace.json_size(response))
+                    else:
+                        errors[key] = exception
+                
+                batch = self.service.new_batch_http_request()
+                for index, key in enumerate(chunk):
+                    batch.add(pending[key], callback=callback,
+                              request_id=str(index))
+                
+                with publishTrace.span(f"drive.{name}", batch=len(chunk)) as span:
+                    span.add(requests=1, bytes=sum(
+                        publishTrace.request_size(pending[key]) for key in chunk))
+                    try:
+                        batch.execute()
+                    
+                    except Exception as e:
+                        # The whole http request failed, like a network
+                        # error, its requests are retried with the others
+                        for key in chunk:
+                            if key not in responses and key not in errors:
+                                errors[key] = e
+            
+            pending = {}
+            for key, error in errors.items():
+                if (attempt > 0 and isinstance(error, HttpError)
+                        and error.resp.status == 409):
+                    # Applied by a previous try, its response was lost
+                    responses[key] = None
+                elif attempt < self.NUM_RETRIES and self._retryable(error):
+                    pending[key] = requests[key]
+                else:
+                    failed[key] = error
+            
+            if not pending:
+                break
+            
+            # Waits more at each retry for the rate limit
+            time.sleep(2 ** attempt)
+        
+        if failed:
+            raise UploadError(list(failed.items()))
+        
+        return responses
     
-    def upload_file(self, file_path, parent_id):
+    def _retryable(self, error):
+        from googleapiclient.errors import HttpError
+        from httplib2 import HttpLib2Error
+        
+        # Connection lost or timeout before the response
+        if isinstance(error, (OSError, HttpLib2Error)):
+            return True
+        
+        if not isinstance(error, HttpError):
+            return False
+        
+        status = error.resp.status
+        if status == 403:
+            # The other 403 like the permissions never succeed
+            return bool(self.RATE_LIMIT_REASONS.intersection(
+                self._error_reasons(error)))
+        
+        return status in self.RETRY_STATUS
+    
+    @staticmethod
+    def _error_reasons(error):
+        # Reasons of the errors at the body like "userRateLimitExceeded"
+        try:
+            content = json.loads(error.content)
+            
+            return [item.get("reason") for item in content["error"]["errors"]]
+        
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return []
+    
+    def generate_ids(self, count):
+        """Gets ids of Google Drive for files not created yet.
+        
+        :param count: Number of ids.
+        :return: List with the ids.
+        :rtype: list
+        """
+        
+        ids = []
+        while len(ids) < count:
+            request = self.service.files().generateIds(
+                count=min(count - len(ids), self.GENERATE_IDS_LIMIT),
+                space="drive")
+            ids += self._execute(request, "generate_ids")["ids"]
+        
+        # ["1a2b3c...", "4d5e6f..."]
+        return ids
+    
+    @staticmethod
+    def upload_key(file_path, parent_id):
+        """Creates the key of the resumable session of an upload, it changes
+        if the file changes.
+        
+        :param file_path: Path where the file are.
+        :param parent_id: Id of the parent folder.
+        :return: The key of the upload.
+        :rtype: str
+        """
+        
+        stat = os.stat(file_path)
+        
+        # "D:/cache/rock_v004.usd|2147483648|1743675705.0|127763ygaqshjvajsayfs651gv"
+        return (f"{os.path.abspath(file_path)}|{stat.st_size}|"
+                f"{stat.st_mtime}|{parent_id}")
+    
+    def upload_file(self, file_path, parent_id, chunk_size=None,
+                    progress=None):
         """Upload a file to Google Drive within a specific folder.
         
+        The file is sent by chunks at a resumable session saved at disk, if
+        the upload is interrupted the next call with the same file continues
+        from the last byte committed to Drive.
+        
         :param file_path: Path where the file are.
         :param parent_id: Id of the parent folder.
+        :param chunk_size: Bytes sent by request, multiple of 256 KB.
+        :param progress: Function called after each chunk with the bytes
+        uploaded, the total bytes and the path of the file.
         :return: The id of the file.
         :rtype: str
         """
 
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import MediaFileUpload
+
         file_name = os.path.basename(file_path)
         file_metadata = {"name": file_name, "parents": [parent_id]}
-        media = MediaFileUpload(file_path, resumable=True)
+        media = MediaFileUpload(file_path, chunksize=chunk_size or self.CHUNK_SIZE,
+                                resumable=True)
+        request = self.service.files().create(body=file_metadata,
+                                              media_body=media, fields="id")
 
-        file = (
-            self.service.files()
-            .create(body=file_metadata, media_body=media, fields="id")
-            .execute()
-        )
+        key = self.upload_key(file_path, parent_id)
+        uri = self.SESSIONS.get(key)
+        if uri:
+            # Asks Drive for the bytes committed before sending the next chunk
+            request.resumable_uri = uri
+            request._in_error_state = True
+
+        file = None
+        with publishTrace.span("drive.upload_file", file=file_name) as span:
+            while file is None:
+                sent = request.resumable_progress
+                try:
+                    status, file = request.next_chunk(num_retries=self.NUM_RETRIES)
+                
+                except HttpError as e:
+                    # The saved session expired, starts the upload again
+                    if uri and e.resp.status in (404, 410):
+                        self.SESSIONS.remove(key)
+                        return self.upload_file(file_path, parent_id,
+                                                chunk_size, progress)
+                    raise
+                
+                span.add(requests=1,
+                         bytes=max(request.resumable_progress - sent, 0))
+                
+                if request.resumable_uri != uri:
+                    uri = request.resumable_uri
+                    self.SESSIONS.set(key, uri)
+                
+                if status and progress:
+                    progress(status.resumable_progress, status.total_size,
+                             file_path)
+        
+        self.SESSIONS.remove(key)
+        
+        # The last chunk returns the file without status
+        if progress:
+            total = os.path.getsize(file_path)
+            progress(total, total, file_path)
         
         # "127763ygaqshjvajsayfs651gv"
         return file.get("id")
     
-    def upload_folder(self, folder_path, parent_id):
+    def upload_folder(self, folder_path, parent_id, workers=None,
+                      progress=None, previous_id=None):
         """Upload a folder and all its contents to Google Drive.
         
+        The subfolders are created first mirroring the local tree, a batch
+        request by level, and then the files are uploaded at the same time by
+        a pool of workers.
+        
+        With the folder of the previous version, the files that didn't change
+        are copied at Drive from that folder instead of uploaded again, the
+        copies are sent together with batch requests.
+        
         :param folder_path: Path where the folder are.
         :param parent_id: Id of the parent folder.
+        :param workers: Number of files uploaded at the same time.
+        :param progress: Function called after each file with the number of
+        files done, the total of files and the path of the file.
+        :param previous_id: Id of the folder of the previous version.
         :return: The id of the folder.
         :rtype: str
         """
 
-        folder_name = os.path.basename(folder_path)
-        folder_id = self.create_folder(folder_name, parent_id)
+        folder_ids = self.create_folders(folder_path, parent_id)
+        files = []
+
+        for root, dirs, file_names in os.walk(folder_path):
+            dirs.sort()
+            for file_name in sorted(file_names):
+                files.append((os.path.join(root, file_name), folder_ids[root]))
+
+        previous = self.list_files(previous_id) if previous_id else {}
+
+        errors = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers or self.UPLOAD_WORKERS) as pool:
+            unchanged = self._unchanged(pool, files, folder_path, previous)
 
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path):  # Solo sube archivos (ignora subcarpetas)
-                self.upload_file(file_path, folder_id)
+            futures = {}
+            copies = {}
+            # Ids of the copies, so a retry can't duplicate a file
+            copy_ids = iter(self.generate_ids(len(unchanged)))
+            for file_path, folder_id in files:
+                if file_path in unchanged:
+                    # Copied at Drive, no bytes are uploaded
+                    body = {"name": os.path.basename(file_path),
+                            "parents": [folder_id], "id": next(copy_ids)}
+                    copies[file_path] = self.service.files().copy(
+                        fileId=unchanged[file_path], body=body, fields="id")
+                else:
+                    future = pool.submit(publishTrace.wrap(self.upload_file),
+                                         file_path, folder_id)
+                    futures[future] = file_path
+
+            # The copies are sent together while the workers upload
+            try:
+                self.execute_batch(copies, "copy_files")
+
+            except UploadError as e:
+                errors += e.errors
+
+            for file_path in copies:
+                done += 1
+                if progress:
+                    progress(done, len(files), file_path)
+
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    future.result()
+                
+                except Exception as e:
+                    errors.append((file_path, e))
+                
+                done += 1
+                if progress:
+                    progress(done, len(files), file_path)
+
+        if errors:
+            raise UploadError(errors)
 
         # "127763ygaqshjvajsayfs651gv"
-        return folder_id
+        return folder_ids[folder_path]
+
+    def list_files(self, folder_id, prefix=""):
+        """Gets all the files inside a folder of Google Drive and its subfolders.
+        
+        The subfolders of each level of the tree are listed together with
+        batch requests.
+        
+        :param folder_id: Id of the folder.
+        :param prefix: Path added before the names of the files.
+        :return: Dictionary with the relative path of each file like key and
+        a dictionary with its id and md5Checksum like value.
+        :rtype: dict
+        """
+        
+        files = {}
+        # Folders to list by id with the path of their files
+        level = {folder_id: prefix}
+        
+        while level:
+            requests = {id: self._list_request(id) for id in level}
+            subfolders = {}
+            
+            for id, result in self.execute_batch(requests, "list_files").items():
+                items = result.get("files", [])
+                
+                # The folders with more files than a page are read page by page
+                page_token = result.get("nextPageToken")
+                while page_token:
+                    result = self._execute(self._list_request(id, page_token),
+                                           "list_files")
+                    items += result.get("files", [])
+                    page_token = result.get("nextPageToken")
+                
+                for item in items:
+                    path = f"{level[id]}{item['name']}"
+                    if item.get("mimeType") == self.FOLDER_MIME:
+                        subfolders[item["id"]] = f"{path}/"
+                    else:
+                        files[path] = item
+            
+            level = subfolders
+        
+        # {"sub/rock.0001.vdb": {"id": "127763ygaqshjvajsayfs651gv", "md5Checksum": "9e107d..."}}
+        return files
+    
+    def _list_request(self, folder_id, page_token=None):
+        query = f"'{folder_id}' in parents and trashed=false"
+        fields = "nextPageToken, files(id, name, mimeType, md5Checksum)"
+        
+        return self.service.files().list(q=query, fields=fields, pageSize=1000,
+                                         pageToken=page_token)
+
+    @staticmethod
+    def file_md5(file_path, block_size=1024 * 1024):
+        """Calculates the md5 of a file reading it by blocks.
+        
+        :param file_path: Path where the file are.
+        :param block_size: Bytes read at once.
+        :return: The md5 in hexadecimal like Drive md5Checksum.
+        :rtype: str
+        """
+        
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                md5.update(block)
+        
+        # "9e107d9d372bb6826bd81d3542a419d6"
+        return md5.hexdigest()
+
+    def _unchanged(self, pool, files, folder_path, previous):
+        # Files with the same md5 than at the previous version, by their
+        # local path with the id of the previous file
+        candidates = {}
+        for file_path, _ in files:
+            relative_path = os.path.relpath(file_path, folder_path)
+            relative_path = relative_path.replace(os.sep, "/")
+            if relative_path in previous:
+                candidates[file_path] = previous[relative_path]
+
+        md5s = pool.map(self.file_md5, candidates)
+
+        return {file_path: item["id"]
+                for (file_path, item), md5 in zip(candidates.items(), md5s)
+                if item.get("md5Checksum") == md5}
+
+    @staticmethod
+    def _execute(request, name):
+        # Sends a request of the Drive API tracing it
+        with publishTrace.span(f"drive.{name}") as span:
+            span.add(requests=1, bytes=publishTrace.request_size(request))
+            response = request.execute()
+            span.add(bytes=publishTrace.json_size(response))
+            return response
+
+    def stream_folder(self, folder_path, parent_id, workers=None):
+        """Starts uploading the files of a folder while they are written.
+        
+        :param folder_path: Path of the folder to watch.
+        :param parent_id: Id of the parent folder.
+        :param workers: Number of files uploaded at the same time.
+        :return: The StreamingUpload running, its finish method returns the
+        id of the folder.
+        :rtype: StreamingUpload
+        """
+        
+        return StreamingUpload(self, folder_path, parent_id, workers).start()
 
     def share_link(self, file_id):
         """Create the link to share and get public permisions at the file.
@@ -153,13 +876,208 @@ class GoogleDrive:
         """
         
         # Grant permissions so anyone with the link can view the file
-        self.service.permissions().create(
+        self._execute(self.service.permissions().create(
             fileId=file_id,
             body={"role": "reader", "type": "anyone"},
-        ).execute()
+        ), "share_link")
 
         # Generate public link
         link = f"https://drive.google.com/file/d/{file_id}/view"
         
         return link
-     
+
+    def share_links(self, file_ids):
+        """Create the links to share several files, the permissions are
+        granted with batch requests.
+        
+        :param file_ids: List with the ids of the files.
+        :return: Dictionary with the id and the link of each file.
+        :rtype: dict
+        """
+        
+        permissions = self.service.permissions()
+        requests = {
+            file_id: permissions.create(fileId=file_id,
+                                        body={"role": "reader", "type": "anyone"})
+            for file_id in file_ids
+        }
+        self.execute_batch(requests, "share_links")
+        
+        # {"127763ygaqshjvajsayfs651gv": "https://drive.google.com/file/d/127763ygaqshjvajsayfs651gv/view"}
+        return {file_id: f"https://drive.google.com/file/d/{file_id}/view"
+                for file_id in file_ids}
+    
+    def delete_file(self, file_id):
+        """Deletes a file from Google Drive.
+        
+        :param file_id: Id of the file to delete.
+        """
+        
+        self._execute(self.service.files().delete(fileId=file_id),
+                      "delete_file")
+
+
+class StreamingUpload:
+    """Uploads the files of a folder while they are being written, each file
+    is uploaded as soon as it stops changing.
+    """
+    
+    # Seconds between each scan of the folder
+    POLL_INTERVAL = 0.5
+    # Seconds without changes for consider a file finished
+    SETTLE_TIME = 1.0
+    
+    def __init__(self, drive, folder_path, parent_id, workers=None):
+        """
+        :param drive: GoogleDrive used for the uploads.
+        :param folder_path: Path of the folder to watch.
+        :param parent_id: Id of the parent folder at Google Drive.
+        :param workers: Number of files uploaded at the same time.
+        """
+        
+        self.drive = drive
+        self.folder_path = folder_path
+        self.parent_id = parent_id
+        self.folder_id = None
+        
+        self._pool = ThreadPoolExecutor(max_workers=workers or drive.UPLOAD_WORKERS)
+        self._folder_ids = {}
+        self._seen = {}
+        self._futures = {}
+        # Size and date of each file when its upload was submitted
+        self._submitted = {}
+        # Files of a previous export left at the folder
+        self._stale = {}
+        self._started = None
+        # Span of the publish, the uploads of the workers belong to it
+        self._trace = None
+        self._done = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Creates the folder at Google Drive and starts watching the local
+        folder.
+        
+        :return: The StreamingUpload itself.
+        :rtype: StreamingUpload
+        """
+        
+        os.makedirs(self.folder_path, exist_ok=True)
+        self._trace = publishTrace.current()
+        self.folder_id = self._remote_folder(self.folder_path)
+        
+        # The files of a previous export look finished until the ROP
+        # overwrites them, so they wait until they are written again
+        self._started = time.time()
+        for root, dirs, file_names in os.walk(self.folder_path):
+            for file_name in file_names:
+                file_path = os.path.join(root, file_name)
+                self._stale[file_path] = self._file_state(file_path)
+        
+        self._thread = threading.Thread(target=self._watch, daemon=True,
+                                        name="StreamingUpload")
+        self._thread.start()
+        
+        return self
+    
+    def finish(self):
+        """Uploads the files left once the folder is completely written and
+        waits for all the uploads.
+        
+        :return: The id of the folder at Google Drive.
+        :rtype: str
+        """
+        
+        self._done.set()
+        self._thread.join()
+        self._scan(final=True)
+        
+        errors = []
+        for file_path, future in list(self._futures.items()):
+            try:
+                file_id = future.result()
+                
+                # Written again after its upload, like a pause of the ROP
+                # longer than SETTLE_TIME, it's uploaded again
+                if self._file_state(file_path) != self._submitted[file_path]:
+                    self._submit(file_path, os.path.dirname(file_path))
+                    self._futures[file_path].result()
+                    self.drive.delete_file(file_id)
+            
+            except Exception as e:
+                errors.append((file_path, e))
+        
+        self._pool.shutdown()
+        
+        if errors:
+            raise UploadError(errors)
+        
+        # "127763ygaqshjvajsayfs651gv"
+        return self.folder_id
+    
+    def cancel(self):
+        """Stops watching the folder and discards the pending uploads."""
+        
+        self._done.set()
+        self._thread.join()
+        self._pool.shutdown(cancel_futures=True)
+    
+    def _watch(self):
+        with publishTrace.attach(self._trace):
+            while not self._done.wait(self.POLL_INTERVAL):
+                self._scan(final=False)
+    
+    def _scan(self, final):
+        now = time.time()
+        
+        for root, dirs, file_names in os.walk(self.folder_path):
+            dirs.sort()
+            for file_name in sorted(file_names):
+                file_path = os.path.join(root, file_name)
+                if file_path in self._futures:
+                    continue
+                
+                state = self._file_state(file_path)
+                if state is None:
+                    continue
+                
+                if (not final and file_path in self._stale
+                        and state[1] <= self._started):
+                    continue
+                
+                # Same size and date than the last scan and old enough
+                settled = (self._seen.get(file_path) == state
+                           and now - state[1] >= self.SETTLE_TIME)
+                self._seen[file_path] = state
+                
+                if final or settled:
+                    self._submit(file_path, root)
+    
+    def _submit(self, file_path, root):
+        self._submitted[file_path] = self._file_state(file_path)
+        self._futures[file_path] = self._pool.submit(
+            publishTrace.wrap(self.drive.upload_file, self._trace), file_path,
+            self._remote_folder(root))
+    
+    @staticmethod
+    def _file_state(file_path):
+        try:
+            stat = os.stat(file_path)
+        
+        except OSError:
+            return None
+        
+        return (stat.st_size, stat.st_mtime)
+    
+    def _remote_folder(self, folder_path):
+        # Creates the folders of the local tree at Drive the first time
+        if folder_path not in self._folder_ids:
+            if folder_path == self.folder_path:
+                parent_id = self.parent_id
+            else:
+                parent_id = self._remote_folder(os.path.dirname(folder_path))
+            
+            self._folder_ids[folder_path] = self.drive.create_folder(
+                os.path.basename(folder_path), parent_id)
+        
+        return self._folder_ids[folder_path]
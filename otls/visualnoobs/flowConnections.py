@@ -1,12 +1,345 @@
 import os
-import shotgun_api3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import flowStore
+import publishTrace
+
+
+class FlowCache:
+	"""Session cache for the Flow reads, shared by every Flow instance of the
+	Houdini session.
+
+	Each entry expires after the ttl of its entity type and the least recently
+	used entries are evicted when the cache is full.
+	"""
+
+	# Seconds that the reads of each entity type are valid
+	ENTITY_TTL = {
+		"HumanUser": 3600,
+		"Project": 600,
+		"Task": 300,
+		"Asset": 120,
+		"AssetType": 600,
+	}
+	DEFAULT_TTL = 60
+
+	def __init__(self, max_entries=256):
+		self.max_entries = max_entries
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		# Events of the keys being loaded by a thread
+		self._loading = {}
+
+	def get(self, key):
+		"""Gets a value of the cache if it exists and it isn't expired.
+
+		:param key: Tuple with the entity type as first item.
+		:return: The value saved or None.
+		"""
+
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+
+			expires, value = entry
+			if expires < time.monotonic():
+				del self._entries[key]
+				return None
+
+			self._entries.move_to_end(key)
+
+			return value
+
+	def set(self, key, value):
+		"""Saves a value at the cache with the ttl of its entity type.
+
+		:param key: Tuple with the entity type as first item.
+		:param value: Value to save.
+		"""
+
+		ttl = self.ENTITY_TTL.get(key[0], self.DEFAULT_TTL)
+
+		with self._lock:
+			self._entries[key] = (time.monotonic() + ttl, value)
+			self._entries.move_to_end(key)
+
+			# Evict the least recently used entries
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def get_or_load(self, key, loader):
+		"""Gets a value of the cache or loads it. The threads that ask for a
+		key while another thread loads it wait for that value instead of
+		reading it again from Flow.
+
+		:param key: Tuple with the entity type as first item.
+		:param loader: Function that reads the value from Flow.
+		:return: The value of the key.
+		"""
+
+		while True:
+			value = self.get(key)
+			if value is not None:
+				return value
+
+			with self._lock:
+				event = self._loading.get(key)
+				loading = event is None
+				if loading:
+					event = self._loading[key] = threading.Event()
+
+			if not loading:
+				# Checks the cache again, or loads it if the other load failed
+				event.wait()
+				continue
+
+			try:
+				value = loader()
+				self.set(key, value)
+
+				return value
+
+			finally:
+				with self._lock:
+					del self._loading[key]
+				event.set()
+
+	def invalidate(self, entity_type=None):
+		"""Removes the entries of an entity type or all the cache.
+
+		:param entity_type: Entity type like "Asset", None clears all.
+		"""
+
+		with self._lock:
+			if entity_type is None:
+				self._entries.clear()
+				return
+
+			for key in [k for k in self._entries if k[0] == entity_type]:
+				del self._entries[key]
+
+
+# Lives as long as the Houdini session
+SESSION_CACHE = FlowCache()
+
+
+class ShotgunPool:
+	"""Process wide provider of authenticated Shotgun clients.
+
+	A Shotgun client isn't thread safe, so each thread gets its own client
+	and reuses it for all the Flow and UploadToFlow instances.
+	"""
+
+	def __init__(self, factory=None):
+		"""
+		:param factory: Function that creates the clients instead of
+		shotgun_api3, the benchmarks use it for run offline.
+		"""
+
+		self.factory = factory
+		self._local = threading.local()
+		self._lock = threading.Lock()
+		# Clients of the alive threads
+		self._clients = weakref.WeakSet()
+		self.created = 0
+		self.reused = 0
+
+	def client(self):
+		"""Gets the Shotgun client of the current thread.
+
+		:return: The authenticated client.
+		:rtype: shotgun_api3.Shotgun
+		"""
+
+		sg = getattr(self._local, "sg", None)
+
+		if sg is None:
+			if self.factory is not None:
+				sg = self.factory()
+
+			else:
+				# Imported the first time it's used, the HDA loads this module
+				# on creation and shotgun_api3 is slow to import
+				import shotgun_api3
+
+				sg = shotgun_api3.Shotgun(os.environ["FLOW_URL"],
+										  script_name=os.environ["FLOW_SCRIPT"],
+										  api_key=os.environ["FLOW_KEY"])
+			self._local.sg = sg
+
+			with self._lock:
+				self._clients.add(sg)
+				self.created += 1
+
+		else:
+			with self._lock:
+				self.reused += 1
+
+		return sg
+
+	def stats(self):
+		"""Gets the usage of the pool.
+
+		:return: Dictionary with the clients alive, created and reused.
+		:rtype: dict
+		"""
+
+		with self._lock:
+			# {"size": 2, "created": 3, "reused": 41}
+			return {
+				"size": len(self._clients),
+				"created": self.created,
+				"reused": self.reused,
+			}
+
+
+CLIENT_POOL = ShotgunPool()
+
+
+class MenuNode:
+	"""Project, sequence, shot or task of the menus index."""
+
+	__slots__ = ("name", "id", "children")
+
+	def __init__(self, name, id=None):
+		self.name = name
+		self.id = id
+		# Nodes of the next level by name
+		self.children = {}
+
+	def child(self, name, id=None):
+		"""Gets a child node, creating it the first time.
+
+		:param name: Name of the child.
+		:param id: Flow id of the child.
+		:return: The child node.
+		:rtype: MenuNode
+		"""
+
+		node = self.children.get(name)
+		if node is None:
+			node = self.children[name] = MenuNode(name, id)
+
+		return node
+
+
+class MenuIndex:
+	"""Tree of project, sequence, shot and task built once from the tasks of
+	the user, so each menu is answered with dict lookups and without
+	requests to Flow.
+	"""
+
+	__slots__ = ("root",)
+
+	def __init__(self, projects, tasks):
+		"""
+		:param projects: List with the projects of the user.
+		:param tasks: List with the tasks of the user with their entity and
+		project.
+		"""
+
+		self.root = MenuNode(None)
+		names = {}
+
+		for project in projects:
+			names[project["id"]] = project["name"]
+			self.root.child(project["name"], project["id"])
+
+		for task in tasks:
+			project_id = task["project"]["id"]
+			project = self.root.child(
+				names.get(project_id) or task["project"].get("name"), project_id)
+
+			# The project tasks have no shot, they are only at the project
+			# and task menus
+			entity = task.get("entity")
+			if not entity:
+				continue
+
+			# The shot "LT_0010" belongs to the sequence "LT"
+			shot = entity["name"]
+			sequence = project.child(shot.split("_")[0])
+			sequence.child(shot, entity["id"]).child(task["content"], task["id"])
+
+	def node(self, *path):
+		"""Gets the node of a path like ("EPF", "LT", "LT_0010").
+
+		:return: The node or None if it doesn't exist.
+		:rtype: MenuNode
+		"""
+
+		node = self.root
+		for name in path:
+			node = node.children.get(name)
+			if node is None:
+				return None
+
+		return node
+
+	def names(self, *path):
+		"""Gets the names of the children of a path like ("EPF", "LT"), the
+		projects with an empty path. A None at the path matches all the names
+		of its level.
+
+		:return: A list with the names without repeats like ["LT", "DF"].
+		:rtype: list
+		"""
+
+		nodes = [self.root]
+		for name in path:
+			if name is None:
+				nodes = [child for node in nodes for child in node.children.values()]
+			else:
+				nodes = [node.children[name] for node in nodes
+						 if name in node.children]
+
+		# A selection of each menu is a lookup by level
+		if len(nodes) == 1:
+			return list(nodes[0].children)
+
+		return list(dict.fromkeys(child.name for node in nodes
+								  for child in node.children.values()))
 
 
 class Flow:
+	# Records requested per page in the big queries
+	PAGE_SIZE = 500
+	TASK_FIELDS = ["content", "entity", "project"]
+	# Seconds subtracted to the sync date for the clock differences with Flow
+	SYNC_MARGIN = 60
+
 	def __init__(self):
-		self.sg = shotgun_api3.Shotgun(os.environ["FLOW_URL"],
-									   script_name=os.environ["FLOW_SCRIPT"],
-									   api_key=os.environ["FLOW_KEY"])
+		self.cache = SESSION_CACHE
+
+	@property
+	def sg(self):
+		"""Authenticated Shotgun client of the current thread."""
+
+		return publishTrace.traced(CLIENT_POOL.client(), "flow")
+
+	def cached(self, key, loader):
+		"""Gets the value of the key from the cache or loads it from Flow.
+
+		:param key: Tuple with the entity type as first item.
+		:param loader: Function that reads the value from Flow.
+		:return: The value of the key.
+		"""
+
+		return self.cache.get_or_load(key, loader)
+
+	def invalidate(self, entity_type=None):
+		"""Discards the cached reads after a write at Flow.
+
+		:param entity_type: Entity type written like "Asset", None clears all.
+		"""
+
+		self.cache.invalidate(entity_type)
 
 	def get_user_id(self):
 		"""Gets the ID of the user autenitcate at Flow.
@@ -16,7 +349,9 @@ class Flow:
   		"""
 		SG_USER = os.environ["FLOW_USER"] 
 		filters = [["email", "is", SG_USER]]
-		user_data = self.sg.find_one("HumanUser", filters, fields=["id"])
+		user_data = self.cached(
+			("HumanUser", SG_USER),
+			lambda: self.sg.find_one("HumanUser", filters, fields=["id"]))
 		
 		# 88
 		return user_data["id"]                             
@@ -28,9 +363,12 @@ class Flow:
 		:rtype: list
 		"""
   
-		filters = [["id", "is", self.get_user_id()]]
+		user_id = self.get_user_id()
+		filters = [["id", "is", user_id]]
 		fields = ["projects"]
-		user_projects = self.sg.find_one("HumanUser", filters, fields=fields)
+		user_projects = self.cached(
+			("Project", user_id),
+			lambda: self.sg.find_one("HumanUser", filters, fields=fields))
 		
 		# [{"name": "EPF", "id": 123, "type": "Project"}]...
 		return user_projects["projects"]
@@ -43,44 +381,195 @@ class Flow:
 		:rtype: list
 		"""
   
-		tasks = []
-		for project in self.projects():
-			filters = [
-				["project", "is", {"type": "Project", "id": project["id"]}],
-				["task_assignees", "is", {"type": "HumanUser", "id": self.get_user_id()}],
-			]
-			fields = ["content", "entity", "project"]
-			tasks += self.sg.find("Task", filters, fields)
+		return self.cached(("Task", self.get_user_id()), self._find_tasks)
+
+	def _find_tasks(self, projects=None):
+		"""Reads the tasks of the user at all his projects in one query.
+
+		:param projects: List with the projects to read, by default all the
+		projects of the user.
+		"""
+
+		projects = [{"type": "Project", "id": project["id"]}
+					for project in projects or self.projects()]
+		if not projects:
+			return []
+
+		filters = [
+			["project", "in", projects],
+			["task_assignees", "is", {"type": "HumanUser", "id": self.get_user_id()}],
+		]
 			
 		# [{"name": "fxDesintegracion", "id": 1292, "Shot": "LT_0010", "Project": "EPF"}]
-		return tasks
+		return self.find_paged("Task", filters, self.TASK_FIELDS)
+
+	def find_paged(self, entity_type, filters, fields, retired_only=False):
+		"""Finds the entities requesting them to Flow page by page.
+
+		:param entity_type: Entity type like "Task".
+		:param filters: Filters of the query.
+		:param fields: Fields to return of each entity.
+		:param retired_only: If only the retired entities are returned.
+		:return: List with a dictionary for each entity.
+		:rtype: list
+		"""
+
+		order = [{"field_name": "id", "direction": "asc"}]
+		entities = []
+		page = 1
 
-	def shots(self):
+		while True:
+			records = self.sg.find(entity_type, filters, fields, order=order,
+								   limit=self.PAGE_SIZE, page=page,
+								   retired_only=retired_only)
+			entities += records
+
+			# The last page has less records than the page size
+			if len(records) < self.PAGE_SIZE:
+				break
+
+			page += 1
+
+		return entities
+
+	def menu_index(self):
+		"""Gets the tree of projects, sequences, shots and tasks of the user.
+
+		:return: The index built from one read of the tasks.
+		:rtype: MenuIndex
+		"""
+
+		return self.cached(
+			("Task", self.get_user_id(), "index"),
+			lambda: MenuIndex(self.projects(), self.tasks()))
+
+	def shots(self, project_name=None, sequence=None):
 		"""Creates the shots names from the tasks.
 		
+		:param project_name: Name of the project, None for all the projects.
+		:param sequence: Name of the sequence, None for all the sequences.
 		:return: A list with the shots names.
 		:rtype: list
 		"""
   
-		# Gets the id, name, type of the shots
-		shots = [shot["entity"] for shot in self.tasks()]
-
 		# ["LT_0010", "DF_0010", "DF_0020"]...
-		return shots
+		return self.menu_index().names(project_name, sequence)
 
-	def sequences(self):
+	def sequences(self, project_name=None):
 		"""Creates the sequences names from the tasks.
 		
+		:param project_name: Name of the project, None for all the projects.
 		:return: A list with the sequences names.
 		:rtype: list
 		"""
 
-		# Gets the name of each sequence
-		sequence = [sequence["entity"]["name"].split("_")[0]
-				    for sequence in self.tasks()]
-  		
 		# ["LT", "DF", "MFR", "SE"]...
-		return sequence
+		return self.menu_index().names(project_name)
+
+	def menu_snapshot(self):
+		"""Gets at once all the data that fills the Flow menus of the HDA.
+
+		The data is read from the local store and refreshed with Flow in the
+		background, only the first time it waits for Flow.
+
+		:return: Dictionary with the user id, the names of the projects,
+		sequences, shots and tasks and the MenuIndex for the cascading menus.
+		:rtype: dict
+		"""
+
+		SG_USER = os.environ["FLOW_USER"]
+		store = flowStore.default_store()
+
+		if store.last_sync(SG_USER) is None:
+			self.sync_store()
+		else:
+			refresh_store()
+
+		user_id = store.load("HumanUser", SG_USER)[0]["id"]
+		projects = store.load("Project", SG_USER)
+		tasks = store.load("Task", SG_USER)
+		index = MenuIndex(projects, tasks)
+
+		snapshot = {
+			"user_id": user_id,
+			"projects": index.names(),
+			"sequences": index.names(None),
+			"shots": index.names(None, None),
+			"tasks": [task["content"] for task in tasks],
+			"index": index,
+		}
+
+		# {"user_id": 88, "projects": ["EPF"], "sequences": ["LT"],
+		#  "shots": ["LT_0010"], "tasks": ["fxFire"], "index": MenuIndex}
+		return snapshot
+
+	def sync_store(self):
+		"""Updates the local store with the data of Flow.
+
+		The first sync reads all the tasks of the user, the next ones only
+		the tasks updated at Flow since the last sync and all the tasks of the
+		projects the user joined.
+		"""
+
+		SG_USER = os.environ["FLOW_USER"]
+		store = flowStore.default_store()
+		last_sync = store.last_sync(SG_USER)
+		synced_at = datetime.now() - timedelta(seconds=self.SYNC_MARGIN)
+
+		self.invalidate("Project")
+		user_id = self.get_user_id()
+		projects = self.projects()
+
+		# Projects the user joined since the last sync
+		known_ids = {project["id"] for project in store.load("Project", SG_USER)}
+		new_projects = [project for project in projects
+						if project["id"] not in known_ids]
+
+		store.replace("HumanUser", SG_USER, [{"type": "HumanUser", "id": user_id}])
+		store.replace("Project", SG_USER, projects)
+
+		if last_sync is None:
+			store.replace("Task", SG_USER, self._find_tasks())
+
+		else:
+			project_ids = [project["id"] for project in projects]
+			filters = [
+				["project", "in", [{"type": "Project", "id": id}
+								   for id in project_ids]],
+				["updated_at", "greater_than", datetime.fromisoformat(last_sync)],
+			]
+			fields = self.TASK_FIELDS + ["task_assignees"]
+
+			assigned = []
+			unassigned = []
+			for task in self.find_paged("Task", filters, fields):
+				assignees = task.pop("task_assignees", None) or []
+				if any(assignee["type"] == "HumanUser" and assignee["id"] == user_id
+					   for assignee in assignees):
+					assigned.append(task)
+				else:
+					unassigned.append(task["id"])
+
+			# Tasks of the projects the user doesn't belong anymore
+			unassigned += [task["id"] for task in store.load("Task", SG_USER)
+						   if task["project"]["id"] not in project_ids]
+
+			# Tasks retired (deleted) at Flow since the last sync
+			unassigned += [task["id"] for task in self.find_paged(
+				"Task", filters, ["id"], retired_only=True)]
+
+			# The old tasks of a new project aren't updated since the last
+			# sync, all its tasks of the user are read
+			if new_projects:
+				assigned += self._find_tasks(new_projects)
+
+			store.upsert("Task", SG_USER, assigned)
+			store.delete("Task", SG_USER, unassigned)
+
+		store.set_sync(SG_USER, synced_at.isoformat())
+		# The menus index is built again from the tasks synced
+		self.invalidate("Task")
+		self.cache.set(("Task", user_id), store.load("Task", SG_USER))
 
 	def tasks_data(self):
 		"""Creates a dictionary with the task names and id.
@@ -109,26 +598,43 @@ class Flow:
 		# {"EPF": 123, "NPT": 124}...
 		return project
 
-	def asset_type(self):
+	def asset_type(self, project_name=None):
 		"""Gets the types of the assets assign at the project.
 
+		Flow groups the assets by type at the server, so only the types are
+		transferred instead of all the assets.
+
+		:param project_name: Name of the project, None for all the projects.
 		:return: A list with the type of assets like ["Model", "Camera"].
 		:rtype: list
   		"""
-    
-		r = self.sg.find("Asset", [], fields=["sg_asset_type"])
 
-		type_list = [type["sg_asset_type"] for type in r]
+		filters = []
+		project_id = None
+		if project_name is not None:
+			project_id = self.project_data()[project_name]
+			filters = [["project", "is", {"type": "Project", "id": project_id}]]
+
+		r = self.cached(
+			("AssetType", project_id),
+			lambda: self.sg.summarize(
+				"Asset", filters,
+				summary_fields=[{"field": "id", "type": "count"}],
+				grouping=[{"field": "sg_asset_type", "type": "exact",
+						   "direction": "asc"}]))
+
+		type_list = [group["group_name"] for group in r["groups"]
+					 if group["group_name"]]
 		
 		# ["Model", "Environment", "Camera"]...
-		return list(dict.fromkeys(type_list))
+		return type_list
 
 	def asset_id(self, asset_name, project_name):
 		"""Get the id of the asset at the project.
 
 		:param asset_name: Name of the asset to search for.
 		:param project_name: Name of the project in which the asset is located.
-		:return: The asset id.
+		:return: The asset id or None if the asset doesn't exist.
 		:rtype: int
   		"""		
     
@@ -139,10 +645,120 @@ class Flow:
 			["code", "is", asset_name]
 		]
 
-		r = self.sg.find("Asset", filters, fields=["id"])
+		# Index of the asset codes kept up to date by create_asset
+		r = self.cached(
+			("Asset", project_id, asset_name),
+			lambda: self.sg.find_one("Asset", filters, fields=["id"]))
   
 		# 123...
-		return r[0]["id"]
+		return r["id"] if r else None
+
+
+_REFRESH = None
+# time.monotonic() of the end of the last background sync
+_REFRESHED_AT = 0.0
+
+
+def refresh_store():
+	"""Syncs the local store with Flow at a background thread, if there isn't
+	a sync running yet.
+	"""
+
+	global _REFRESH
+
+	if _REFRESH is not None and _REFRESH.is_alive():
+		return
+
+	def sync():
+		global _REFRESHED_AT
+
+		try:
+			# The pool gives its own Shotgun client to this thread
+			Flow().sync_store()
+			_REFRESHED_AT = time.monotonic()
+
+		except Exception as e:
+			print(f"Error syncing the Flow store: {e}")
+
+	_REFRESH = threading.Thread(target=sync, name="FlowStoreSync", daemon=True)
+	_REFRESH.start()
+
+
+_PREFETCH = {}
+_PREFETCH_LOCK = threading.Lock()
+_PREFETCH_POOL = None
+# Seconds that a prefetched result is used after it's read
+PREFETCH_MAX_AGE = 60
+
+
+def prefetch():
+	"""Starts the Flow reads of the HDA menus at background threads, when
+	the node is created or a hip file is loaded.
+
+	The user id and the asset types are read at the same time that the menu
+	snapshot, each thread with its own pooled client. The reads are saved at
+	the session cache, and the snapshot is taken by prefetched.
+	"""
+
+	global _PREFETCH_POOL
+
+	with _PREFETCH_LOCK:
+		if _PREFETCH_POOL is None:
+			_PREFETCH_POOL = ThreadPoolExecutor(max_workers=4,
+												thread_name_prefix="FlowPrefetch")
+
+		flow = Flow()
+		reads = {
+			"user_id": flow.get_user_id,
+			"asset_types": flow.asset_type,
+			"snapshot": flow.menu_snapshot,
+		}
+
+		for name, read in reads.items():
+			# A read still running isn't started again
+			if name not in _PREFETCH or _PREFETCH[name].done():
+				future = _PREFETCH_POOL.submit(read)
+				future.add_done_callback(_set_done_at)
+				_PREFETCH[name] = future
+
+
+def _set_done_at(future):
+	future.done_at = time.monotonic()
+
+
+def prefetched(name, loader):
+	"""Gets the result of a prefetched read, waiting for it if it's still
+	running. Each result is used once, without a prefetch it's loaded now.
+
+	A result read more than PREFETCH_MAX_AGE seconds ago, or before the end
+	of the last background sync of the store, is loaded again.
+
+	:param name: Name of the read like "snapshot".
+	:param loader: Function that loads the value without prefetch.
+	:return: The value read.
+	"""
+
+	with _PREFETCH_LOCK:
+		future = _PREFETCH.pop(name, None)
+
+	if future is None:
+		return loader()
+
+	try:
+		value = future.result()
+
+	except Exception as e:
+		print(f"Error prefetching the Flow {name}: {e}")
+
+		return loader()
+
+	# The done time is set by the pool thread just after the result
+	done_at = getattr(future, "done_at", time.monotonic())
+	if (time.monotonic() - done_at > PREFETCH_MAX_AGE
+			or _REFRESHED_AT > done_at):
+		return loader()
+
+	return value
 
 
 class UploadToFlow(Flow):
@@ -176,6 +792,7 @@ class UploadToFlow(Flow):
 
 		# Creates the version of the mp4 first
 		r = self.sg.create("Version",data, return_fields=["id"])
+		self.invalidate("Version")
 
 		movie = os.path.join(outputpath, f"{basename}.mp4")
 
@@ -194,27 +811,82 @@ class UploadToFlow(Flow):
 		:param asset_link: The link with the file are saved.
      	"""
       
-		p_id = self.project_data()[project_name]
-  
-		filters = [
-      	["project", "is", {"type": "Project", "id": p_id}],
-       ]		
-  
-		r = self.sg.find("Asset", filters, fields=["code"])
+		self.publish_assets(project_name, [(asset_name, version, asset_link)])
 
-		assets_name = [name["code"] for name in r]
-    
-		asset_version = f"{asset_name}_v{version:03d}"
-        
-		if asset_name in assets_name:
-			asset_id = self.asset_id(asset_name, project_name)
-			self.up_asset_version(project_name, asset_id, asset_version, 
-                         		  asset_link)
+	def publish_assets(self, project_name, assets):
+		"""Publish the versions of several assets of a project, creating the
+		assets that don't exist yet.
 
-		else:
-			asset_id = self.create_asset(project_name, asset_name)
-			self.up_asset_version(project_name, asset_id, asset_version, 
-                                  asset_link)
+		The writes are sent with batch, all the new assets in one request and
+		all the versions in another one. A Version can't reference an Asset
+		created at the same batch, so they can't share it.
+
+		:param project_name: Name of the project.
+		:param assets: List of tuples with the asset name, the version number
+		and the link of the files like [("rock", 4, "https://...")].
+		:return: List with the ids of the versions created.
+		:rtype: list
+  		"""
+
+		project_id = self.project_data()[project_name]
+		user_id = self.get_user_id()
+
+		asset_ids = self.asset_ids([name for name, _, _ in assets], project_name)
+		missing = list(dict.fromkeys(name for name, _, _ in assets
+									 if asset_ids.get(name) is None))
+
+		if missing:
+			requests = [{"request_type": "create", "entity_type": "Asset",
+						 "data": self._asset_data(project_id, name)}
+						for name in missing]
+			for name, r in zip(missing, self.sg.batch(requests)):
+				asset_ids[name] = r["id"]
+				self.cache.set(("Asset", project_id, name),
+							   {"type": "Asset", "id": r["id"]})
+			self.invalidate("AssetType")
+
+		requests = [{"request_type": "create", "entity_type": "Version",
+					 "data": self._version_data(
+						 project_id, user_id, asset_ids[name],
+						 f"{name}_v{version:03d}", link)}
+					for name, version, link in assets]
+		versions = self.sg.batch(requests)
+		self.invalidate("Version")
+
+		# [1453, 1454]...
+		return [r["id"] for r in versions]
+
+	def asset_ids(self, asset_names, project_name):
+		"""Get the ids of several assets of the project, the assets that
+		aren't cached are read with one query.
+
+		:param asset_names: List with the names of the assets.
+		:param project_name: Name of the project in which the assets are.
+		:return: Dictionary with the name and the id of each asset, None if
+		the asset doesn't exist.
+		:rtype: dict
+  		"""
+
+		project_id = self.project_data()[project_name]
+		ids = {}
+
+		for name in asset_names:
+			r = self.cache.get(("Asset", project_id, name))
+			ids[name] = r["id"] if r else None
+
+		unknown = [name for name, id in ids.items() if id is None]
+		if unknown:
+			filters = [
+				["project", "is", {"type": "Project", "id": project_id}],
+				["code", "in", unknown]
+			]
+			for r in self.sg.find("Asset", filters, fields=["code"]):
+				ids[r["code"]] = r["id"]
+				self.cache.set(("Asset", project_id, r["code"]),
+							   {"type": "Asset", "id": r["id"]})
+
+		# {"rock": 123, "tree": None}...
+		return ids
 
 	def create_asset(self, project_name, asset_name):
 		"""Create an asset in the Asset Entity Type of Flow.
@@ -226,14 +898,12 @@ class UploadToFlow(Flow):
   		"""
 		
 		p_id = self.project_data()[project_name]
-     
-		data = {
-			"project": {"type": "Project", "id": p_id},
-			"code": asset_name,
-			"sg_asset_type": "Model",
-		}
+
+		data = self._asset_data(p_id, asset_name)
 
 		r = self.sg.create("Asset",data, return_fields=["id"])
+		self.cache.set(("Asset", p_id, asset_name), {"type": "Asset", "id": r["id"]})
+		self.invalidate("AssetType")
 
 		# 89
 		return r["id"]
@@ -250,8 +920,25 @@ class UploadToFlow(Flow):
      
 		project_id = self.project_data()[project_name]
 		user_id = self.get_user_id()
-     
-		data = {
+
+		data = self._version_data(project_id, user_id, asset_id, asset_version,
+								  asset_link)
+
+		self.sg.create("Version",data, return_fields=["id"])
+		self.invalidate("Version")
+
+	@staticmethod
+	def _asset_data(project_id, asset_name):
+		return {
+			"project": {"type": "Project", "id": project_id},
+			"code": asset_name,
+			"sg_asset_type": "Model",
+		}
+
+	@staticmethod
+	def _version_data(project_id, user_id, asset_id, asset_version,
+					  asset_link):
+		return {
 			"project": {"type": "Project", "id": project_id},
 			"entity": {"type": "Asset", "id": asset_id},
 			"code": asset_version,
@@ -259,6 +946,3 @@ class UploadToFlow(Flow):
 			"sg_path_to_geometry": asset_link,
 			"user": {"type": "HumanUser", "id": user_id}
 		}
-
-		self.sg.create("Version",data, return_fields=["id"])
-  		
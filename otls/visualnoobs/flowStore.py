@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import threading
+
+import userPrefs
+
+
+class FlowStore:
+    """Local SQLite store with the last data fetched from Flow, so the menus
+    can be filled without waiting for the network.
+    """
+
+    def __init__(self, path=None):
+        """Opens the store creating the database if it doesn't exist.
+
+        :param path: Path of the database file, by default inside the
+        Houdini user prefs directory.
+        """
+
+        self.path = path or self.default_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                entity_type TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (entity_type, owner, id)
+            );
+            CREATE TABLE IF NOT EXISTS syncs (
+                owner TEXT PRIMARY KEY,
+                synced_at TEXT NOT NULL
+            );
+            """
+        )
+
+    @staticmethod
+    def default_path():
+        """Gets the path of the database at the Houdini user prefs.
+
+        :return: Path like "C:/Users/User/Documents/houdini20.5/visualnoobs/flow.db"
+        :rtype: str
+        """
+
+        return userPrefs.pref_path("flow.db")
+
+    def load(self, entity_type, owner):
+        """Gets the entities saved of an entity type.
+
+        :param entity_type: Entity type like "Task".
+        :param owner: Flow user the entities belong to.
+        :return: List with a dictionary for each entity.
+        :rtype: list
+        """
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM entities WHERE entity_type = ? AND owner = ? "
+                "ORDER BY id",
+                (entity_type, owner),
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def replace(self, entity_type, owner, entities):
+        """Saves the entities of an entity type removing the previous ones.
+
+        :param entity_type: Entity type like "Task".
+        :param owner: Flow user the entities belong to.
+        :param entities: List with a dictionary for each entity.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM entities WHERE entity_type = ? AND owner = ?",
+                (entity_type, owner),
+            )
+            self._insert(entity_type, owner, entities)
+
+    def upsert(self, entity_type, owner, entities):
+        """Saves the entities of an entity type updating the existing ones.
+
+        :param entity_type: Entity type like "Task".
+        :param owner: Flow user the entities belong to.
+        :param entities: List with a dictionary for each entity.
+        """
+
+        with self._lock, self._db:
+            self._insert(entity_type, owner, entities)
+
+    def delete(self, entity_type, owner, ids):
+        """Removes the entities of an entity type by id.
+
+        :param entity_type: Entity type like "Task".
+        :param owner: Flow user the entities belong to.
+        :param ids: Ids of the entities to remove.
+        """
+
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM entities WHERE entity_type = ? AND owner = ? "
+                "AND id = ?",
+                [(entity_type, owner, id) for id in ids],
+            )
+
+    def last_sync(self, owner):
+        """Gets when the data of the user was synced with Flow for last time.
+
+        :param owner: Flow user.
+        :return: Date in iso format or None if never was synced.
+        :rtype: str
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT synced_at FROM syncs WHERE owner = ?", (owner,)
+            ).fetchone()
+
+        # "2025-04-03T10:21:45"
+        return row[0] if row else None
+
+    def set_sync(self, owner, synced_at):
+        """Saves when the data of the user was synced with Flow.
+
+        :param owner: Flow user.
+        :param synced_at: Date in iso format.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO syncs (owner, synced_at) VALUES (?, ?)",
+                (owner, synced_at),
+            )
+
+    def _insert(self, entity_type, owner, entities):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO entities (entity_type, id, owner, data) "
+            "VALUES (?, ?, ?, ?)",
+            [(entity_type, entity["id"], owner, json.dumps(entity))
+             for entity in entities],
+        )
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def default_store():
+    """Gets the store shared by all the session.
+
+    :return: The FlowStore at the Houdini user prefs.
+    :rtype: FlowStore
+    """
+
+    global _STORE
+
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = FlowStore()
+
+    return _STORE
@@ -2,104 +2,155 @@ import flowConnections
 import hou # type: ignore
 
 
+# Last snapshot of the menus of the session, the cascading menus read it
+# instead of the store at each selection change
+_SNAPSHOT = None
+# Callback of the hip file events registered by prefetch_on_load
+_PREFETCH_CALLBACK = None
+
+
 class Parameters:
-    def menu_project(self):
-        """Creates the project menu data from flow."""
+    def __init__(self, snapshot=None):
+        self._snapshot = snapshot
+        self._indices = {}
+
+    @property
+    def snapshot(self):
+        """Data of the Flow menus read once for all the menus.
+        
+        :return: Dictionary from flowConnections.Flow.menu_snapshot.
+        :rtype: dict
+        """
+        
+        global _SNAPSHOT
+        
+        if self._snapshot is None:
+            # Started when the node was created or the hip was loaded
+            self._snapshot = flowConnections.prefetched(
+                "snapshot", flowConnections.Flow().menu_snapshot)
+            _SNAPSHOT = self._snapshot
+        
+        return self._snapshot
+
+    # HDA menu parameter and the key of its names at the snapshot
+    MENUS = {
+        "project": "projects",
+        "seq": "sequences",
+        "shot": "shots",
+        "task": "tasks",
+    }
+
+    def update_menus(self, parms=None):
+        """Fills the Flow menus with the snapshot data, the HDA definition
+        is rewritten once for all the menus and only if a menu changed.
+        
+        :param parms: List of menu parameters like ["project", "seq"], by
+        default all the menus.
+        """
+        
+        self.write_menus({parm: self.snapshot[self.MENUS[parm]]
+                          for parm in parms or self.MENUS})
+
+    def cascade_menus(self, parm):
+        """Fills the menus below a changed menu with the items of the
+        selection, like the shots of the sequence selected. The items are
+        read from the index of the last snapshot of the session, without
+        reading the store or requesting Flow.
+        
+        :param parm: Menu parameter changed like "project".
+        """
+        
+        node = hou.pwd()
+        snapshot = self._snapshot or _SNAPSHOT or self.snapshot
+        index = snapshot["index"]
+        order = list(self.MENUS)
         
-        projects = flowConnections.Flow().projects()
+        path = [node.parm(name).evalAsString()
+                for name in order[:order.index(parm) + 1]]
+        menus = {}
+        
+        for name in order[order.index(parm) + 1:]:
+            names = index.names(*path)
+            menus[name] = names
+            # The first item is selected at the menus below
+            path.append(names[0] if names else "")
+        
+        self.write_menus(menus)
+        
+        # The menus keep their old index, so they show the items of the path
+        for name in menus:
+            node.parm(name).set(0)
+
+    def write_menus(self, menus):
+        """Sets the items of several menus with one rewrite of the HDA
+        definition.
+        
+        :param menus: Dictionary with the menu parameter and its names.
+        """
+        
+        node = hou.pwd()
+        node_type = node.type().definition()
+        group = node_type.parmTemplateGroup()
+        changed = False
 
-        token = []
-        label = []
+        for parm, names in menus.items():
+            names = list(names)
+            self._indices[parm] = {name: index for index, name in enumerate(names)}
 
-        for project in projects:
-            name = project["name"]
-            token.append(name)
-            label.append(name)
+            menu = node.parm(parm).parmTemplate()
+            if list(menu.menuItems()) == names:
+                continue
 
-        node_type = hou.pwd().type().definition()
-        group = node_type.parmTemplateGroup() 
+            menu.setMenuItems(names)
+            menu.setMenuLabels(names)
+            group.replace(parm, menu)
+            changed = True
 
-        project_menu = hou.pwd().parm("project").parmTemplate()
-        project_menu.setMenuItems(token)
-        project_menu.setMenuLabels(label)
+        # Each rewrite of the definition is slow and marks the library dirty
+        if changed:
+            node_type.setParmTemplateGroup(group)
 
-        group.replace("project", project_menu)
-        node_type.setParmTemplateGroup(group)    
-            
+    def menu_project(self):
+        """Creates the project menu data from flow."""
+        
+        self.update_menus(["project"])
     
     def menu_sequence(self):
         """Creates the sequence menu data from flow."""
         
-        sequences = flowConnections.Flow().sequences()
-
-        token = []
-        label = []
-
-        for sequence in sequences:
-            token.append(sequence)
-            label.append(sequence)
-
-        node_type = hou.pwd().type().definition()
-        group = node_type.parmTemplateGroup() 
-
-        tokens = list(dict.fromkeys(token))
-        labels = list(dict.fromkeys(label))
-
-        sequence_menu = hou.pwd().parm("seq").parmTemplate()
-        sequence_menu.setMenuItems(tokens)
-        sequence_menu.setMenuLabels(labels)
-
-        group.replace("seq", sequence_menu)
-        node_type.setParmTemplateGroup(group)
+        self.update_menus(["seq"])
     
     def menu_shot(self):
         """Creates the shot menu data from flow."""    
         
-        shots = flowConnections.Flow().shots()
-
-        token = []
-        label = []
-
-        for shot in shots:
-            name = shot["name"]
-            token.append(name)
-            label.append(name)
-
-        tokens = list(dict.fromkeys(token))
-        labels = list(dict.fromkeys(label))
-
-        node_type = hou.pwd().type().definition()
-        group = node_type.parmTemplateGroup() 
-
-        shot_menu = hou.pwd().parm("shot").parmTemplate()
-        shot_menu.setMenuItems(tokens)
-        shot_menu.setMenuLabels(labels)
-
-        group.replace("shot", shot_menu)
-        node_type.setParmTemplateGroup(group)
+        self.update_menus(["shot"])
     
     def menu_task(self):
         """Creates the task menu data from flow."""
         
-        tasks = flowConnections.Flow().tasks()
-
-        token = []
-        label = []
+        self.update_menus(["task"])
 
-        for task in tasks:
-            name = task["content"]
-            token.append(name)
-            label.append(name)
-
-        node_type = hou.pwd().type().definition()
-        group = node_type.parmTemplateGroup() 
-
-        sequence_menu = hou.pwd().parm("task").parmTemplate()
-        sequence_menu.setMenuItems(token)
-        sequence_menu.setMenuLabels(label)
-
-        group.replace("task", sequence_menu)
-        node_type.setParmTemplateGroup(group)
+    def menu_index(self, parm, label):
+        """Gets the index of a label at a menu, the labels of each menu are
+        indexed once.
+        
+        :param parm: Menu parameter like "project".
+        :param label: Label of the menu item.
+        :return: The index of the item.
+        :rtype: int
+        """
+        
+        indices = self._indices.get(parm)
+        
+        if indices is None:
+            labels = hou.pwd().parm(parm).menuLabels()
+            indices = self._indices[parm] = {
+                name: index for index, name in enumerate(labels)}
+        
+        if label not in indices:
+            raise ValueError(f"{label} isn't at the {parm} menu")
+        
+        return indices[label]
         
     def menu_parameters_default(self):
         """Sets the parameters of each flow menu based on the current values
@@ -114,27 +165,49 @@ class Parameters:
             shot = basename_split[2]+"_"+basename_split[3]
             task = basename_split[4]
 
-            # Project
-            label_project = hou.pwd().parm("project").menuLabels()
-            index_project = label_project.index(project)
-            sets_project = hou.pwd().parm("project").set(index_project)
-
-            # Seq
-            label_seq = hou.pwd().parm("seq").menuLabels()
-            index_seq = label_seq.index(seq)
-            sets_seq = hou.pwd().parm("seq").set(index_seq)
+            values = {"project": project, "seq": seq, "shot": shot,
+                      "task": task}
 
-            # Shot
-            label_shot = hou.pwd().parm("shot").menuLabels()
-            index_shot = label_shot.index(shot)
-            sets_shot = hou.pwd().parm("shot").set(index_shot)    
-
-            # Task
-            label_task = hou.pwd().parm("task").menuLabels()
-            index_task = label_task.index(task)
-            sets_task = hou.pwd().parm("task").set(index_task) 
+            for parm, label in values.items():
+                hou.pwd().parm(parm).set(self.menu_index(parm, label))
 
         except Exception as e:
             hou.ui.displayMessage(f"An error ocurred: {e}")
-            
-            
\ No newline at end of file
+
+
+def prefetch():
+    """Starts the prefetch of the Flow menus, called from the OnCreated
+    script of the HDA. The prefetch is started through this module so it's
+    saved at the same flowConnections module that the menus read.
+    """
+    
+    flowConnections.prefetch()
+
+
+def prefetch_on_load():
+    """Starts the prefetch of the Flow menus each time a hip file is
+    loaded, called from the pythonrc.py of the user. The callback is
+    registered once by session however many times it's called.
+
+    The publish jobs left by a previous session are resumed at the same
+    time.
+    """
+    
+    global _PREFETCH_CALLBACK
+    
+    if _PREFETCH_CALLBACK is not None:
+        return
+    
+    try:
+        import publishPipeline
+        publishPipeline.resume_queue()
+    
+    except Exception as e:
+        print(f"Error resuming the publish queue: {e}")
+    
+    def on_event(event_type):
+        if event_type == hou.hipFileEventType.AfterLoad:
+            flowConnections.prefetch()
+    
+    _PREFETCH_CALLBACK = on_event
+    hou.hipFile.addEventCallback(on_event)
@@ -2,11 +2,21 @@ import hou # type: ignore
 import os
 
 class Publisher:
-    def __init__(self, name, version, type, output_path):
+    def __init__(self, name, version, type, output_path, node=None):
+        """
+        :param name: Name of the asset.
+        :param version: Number of the asset version.
+        :param type: Extension of the export like ".abc".
+        :param output_path: Directory where export the asset.
+        :param node: Publisher HDA with the ROP nodes, by default the
+        current node.
+        """
+        
         self.name = name
         self.version = version
         self.type = type
         self.output_path = output_path  
+        self.node = node
         
         os.makedirs(self.output_path, exist_ok=True)    
     
@@ -24,11 +34,143 @@ class Publisher:
         # "_v123" | "_v041" | "_v002"
         return final_version
     
+    def output_file(self, type=None):
+        """Build the path of the exported asset, the .vdb caches are exported
+        to a folder with a file by frame.
+        
+        :param type: Extension of the export, by default the publisher one.
+        :return: A string with the path like "D:/assets/rock_v004.abc"
+        :rtype: str
+        """
+        
+        type = type or self.type
+        output_path = f"{self.output_path}{self.name}{self.build_version()}"
+        
+        if type == ".vdb":
+            # "D:/assets/smoke_v004"
+            return output_path
+        
+        # "D:/assets/rock_v004.abc"
+        return f"{output_path}{type}"
+    
+    def export_streaming(self, drive, parent_id):
+        """Export the assets uploading them to Google Drive at the same time.
+        The files of the .vdb caches are uploaded while the ROP is still
+        writing the next frames, the other types are uploaded when the
+        export ends.
+        
+        :param drive: driveConnections.GoogleDrive for the uploads.
+        :param parent_id: Id of the folder where upload the asset.
+        :return: The id of the file or folder uploaded.
+        :rtype: str
+        """
+        
+        if self.type != ".vdb":
+            self.export_assets()
+            
+            return drive.upload_file(self.output_file(), parent_id)
+        
+        stream = drive.stream_folder(self.output_file(), parent_id)
+        
+        try:
+            self.export_assets()
+        
+        except Exception:
+            stream.cancel()
+            raise
+        
+        return stream.finish()
+    
     def export_assets(self):
         """Export the assets acording the type."""
         
-        hda = hou.pwd()
-        output_path = f"{self.output_path}{self.name}{self.build_version()}"
+        node = self.set_output(self.type)
+        
+        # Button pressed for export the assets        
+        node.parm("execute").pressButton()
+    
+    def export_formats(self, types, slots=None):
+        """Export the asset at several types at the same time. A TOP network
+        with a ROP Fetch by type is cooked by a local scheduler, the frames
+        of the .vdb caches are split between its slots and the other types
+        are written by one process each.
+        
+        :param types: List of extensions like [".abc", ".usd", ".vdb"].
+        :param slots: Processes of the scheduler, by default the CPU cores.
+        :return: Dictionary with the path exported of each type.
+        :rtype: dict
+        """
+        
+        hda = self.node or hou.pwd()
+        settings = self.export_settings(hda)
+        
+        # Temporal network next to the HDA, removed when the export ends
+        topnet = hda.parent().createNode("topnet", f"{hda.name()}_export")
+        
+        try:
+            scheduler = topnet.createNode("localscheduler")
+            set_parm(scheduler, "maxprocsmenu", "-1")
+            set_parm(scheduler, "maxprocs", slots or os.cpu_count())
+            topnet.parm("topscheduler").set(scheduler.path())
+            
+            merge = topnet.createNode("merge")
+            fetches = {}
+            rops = {}
+            
+            for index, type in enumerate(types):
+                node = self.set_output(type, settings)
+                
+                # The filecache writes the frames with the ROP inside it
+                rop_path = node.path()
+                if type == ".vdb":
+                    rop_path = f"{rop_path}/render"
+                
+                fetch = topnet.createNode("ropfetch", f"export_{type[1:]}")
+                fetch.parm("roppath").set(rop_path)
+                # A work item by frame, the single file types need them all
+                set_parm(fetch, "framesperbatch", 1)
+                set_parm(fetch, "batchall", type != ".vdb")
+                
+                merge.setInput(index, fetch)
+                fetches[type] = fetch
+                rops[type] = hou.node(rop_path)
+            
+            merge.cookWorkItems(block=True)
+            
+            # The cook ends without error when some work items fail
+            for type, fetch in fetches.items():
+                failed = failed_work_items(fetch)
+                if failed:
+                    raise RuntimeError(f"The {type} export failed at the work "
+                                       f"items: {', '.join(failed)}")
+        
+        finally:
+            topnet.destroy()
+        
+        outputs = {type: self.output_file(type) for type in types}
+        
+        for type, path in outputs.items():
+            # The caches need a file by frame, not only the folder
+            if type == ".vdb":
+                missing = [file for file in rop_output_files(rops[type])
+                           if not os.path.exists(file)]
+            else:
+                missing = [] if os.path.exists(path) else [path]
+            
+            if missing:
+                raise RuntimeError(f"The {type} export failed, {len(missing)} "
+                                   f"files missing: {missing[0]}")
+        
+        return outputs
+    
+    def export_settings(self, hda):
+        """Gets the ROP nodes inside the HDA and the parameters of their
+        output paths.
+        
+        :param hda: Publisher HDA with the ROP nodes.
+        :return: Dictionary with the settings of each type.
+        :rtype: dict
+        """
         
         # Save nodes from the HDA according to the node type
         nodes_types ={
@@ -44,7 +186,7 @@ class Publisher:
                 nodes_types[node.type().name()] = node
                 
         # Settings of each node for export the assets
-        export_setting = {
+        return {
             ".fbx": {
                 "node": nodes_types["rop_fbx"],
                 "param": "sopoutput",
@@ -70,30 +212,108 @@ class Publisher:
                 "extension": ".usd",
             },
             
-        }        
+        }
+    
+    def set_output(self, type, export_setting=None):
+        """Sets the output path of the ROP node of a type.
         
-        if self.type in export_setting:
+        :param type: Extension of the export like ".abc".
+        :param export_setting: Settings from export_settings, by default
+        they're read from the HDA.
+        :return: The ROP node of the type.
+        :rtype: hou.Node
+        """
+        
+        if export_setting is None:
+            export_setting = self.export_settings(self.node or hou.pwd())
+        
+        output_path = f"{self.output_path}{self.name}{self.build_version()}"
+        node = None
+        
+        if type in export_setting:
             # Gets the export settings block of the corresponding node
-            type = export_setting[self.type]
-            node = type["node"]
+            settings = export_setting[type]
+            node = settings["node"]
             
             # If node no exists create it at the export_settings dict
             if node:
-                if self.type == ".vdb":
+                if type == ".vdb":
                     vdb_name = f"{self.name}{self.build_version()}"
-                    node.parm(type["param"]).set(vdb_name)
-                    node.parm(type["param2"]).set(self.output_path)
+                    node.parm(settings["param"]).set(vdb_name)
+                    node.parm(settings["param2"]).set(self.output_path)
                 
                 else:
                     # Nodes that isn't vdb type "fbx"|"abc"|"usd"...
-                    out_file = f"{output_path}{type['extension']}"
-                    node.parm(type["param"]).set(out_file)
+                    out_file = f"{output_path}{settings['extension']}"
+                    node.parm(settings["param"]).set(out_file)
             
             else:
-                hou.ui.displayMessage(f"Unexist {self.type} node" 
+                hou.ui.displayMessage(f"Unexist {type} node" 
                                       f"at export settings")
         
-        # Button pressed for export the assets        
-        node.parm("execute").pressButton()
-        
-        
\ No newline at end of file
+        return node
+
+
+def set_parm(node, name, value):
+    """Sets a parameter if the node has it, the parameters of the TOP nodes
+    change between Houdini versions.
+    
+    :param node: Node of the parameter.
+    :param name: Name of the parameter.
+    :param value: Value to set.
+    """
+    
+    parm = node.parm(name)
+    
+    if parm is None:
+        return
+    
+    try:
+        parm.set(value)
+    
+    except (TypeError, hou.Error):
+        # Menus of integers at some versions and of strings at others
+        parm.set(int(value))
+
+
+def failed_work_items(top_node):
+    """Gets the work items of a TOP node that failed at its last cook.
+    
+    :param top_node: TOP node cooked.
+    :return: List with the names of the work items failed.
+    :rtype: list
+    """
+    
+    import pdg # type: ignore
+    
+    pdg_node = top_node.getPDGNode()
+    if pdg_node is None:
+        return []
+    
+    # ["export_vdb_ropfetch12"]...
+    return [item.name for item in pdg_node.workItems
+            if item.state == pdg.workItemState.CookedFail]
+
+
+def rop_output_files(rop):
+    """Gets the files that a geometry ROP writes for its frame range.
+    
+    :param rop: ROP node with the sopoutput parameter.
+    :return: List with the path of each frame like
+    ["D:/assets/smoke_v004/smoke_v004.1001.vdb"...].
+    :rtype: list
+    """
+    
+    output = rop.parm("sopoutput")
+    
+    # Render the current frame only
+    if rop.parm("trange").eval() == 0:
+        return [output.eval()]
+    
+    start, end, step = rop.parmTuple("f").eval()
+    step = step or 1
+    count = int((end - start) / step + 1e-6) + 1
+    
+    # The same path at all the frames if it hasn't $F
+    return list(dict.fromkeys(output.evalAtFrame(start + index * step)
+                              for index in range(count)))
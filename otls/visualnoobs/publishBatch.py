@@ -0,0 +1,134 @@
+"""Publish a list of assets without the Houdini UI.
+
+Usage:
+    hython publishBatch.py manifest.json --workers 4
+
+The manifest is a json list with an item by asset:
+    [{"hip": "D:/EPF/EPF_LT_0010_fxFire.hip", "node": "/obj/geo1/td_publisher1",
+      "name": "rock", "version": 4, "type": ".abc", "out": "D:/assets/",
+      "project": "EPF"}]
+
+With "types": [".abc", ".usd", ".vdb"] instead of "type" the asset is
+exported at all the types at the same time by a PDG local scheduler.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import hou # type: ignore
+
+import discordNotifier
+import driveConnections
+import houdiniPublisher
+import publishPipeline
+
+
+def publish_hip(hip, assets):
+    """Export and publish the assets of a hip file, the hip is loaded once
+    for all its assets.
+
+    :param hip: Path of the hip file.
+    :param assets: List with the manifest items of the hip.
+    :return: List of tuples with the asset file and the error or None.
+    :rtype: list
+    """
+
+    hou.hipFile.load(hip, suppress_save_prompt=True, ignore_load_warnings=True)
+    results = []
+    exported = []
+
+    for asset in assets:
+        types = asset.get("types") or [asset["type"]]
+        export = houdiniPublisher.Publisher(asset["name"], asset["version"],
+                                            types[0], asset["out"],
+                                            node=hou.node(asset["node"]))
+        jobs = [{
+            "name": asset["name"],
+            "version": asset["version"],
+            "project": asset["project"],
+            "file_path": export.output_file(type),
+        } for type in types]
+
+        try:
+            if len(types) > 1:
+                export.export_formats(types)
+            else:
+                export.export_assets()
+
+        except Exception as e:
+            results.extend((job["file_path"], str(e)) for job in jobs)
+            continue
+
+        exported.extend(jobs)
+
+    # All the assets of the hip are published together
+    if exported:
+        results.extend(publishPipeline.upload_assets(exported))
+
+    # The Discord messages are sent at the background
+    discordNotifier.SENDER.flush()
+
+    return results
+
+
+def warm_caches(assets):
+    """Authenticate with Google Drive and resolve the assets folders once,
+    the workers read the token and the folders ids from disk.
+
+    :param assets: List with the manifest items.
+    """
+
+    g = driveConnections.GoogleDrive()
+    for project in dict.fromkeys(asset["project"] for asset in assets):
+        g.resolve_folder(f"{project}/assets")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish assets from hip files.")
+    parser.add_argument("manifest", help="Json file with the assets to publish.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of hython processes at the same time.")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest) as f:
+        assets = json.load(f)
+
+    warm_caches(assets)
+
+    hips = {}
+    for asset in assets:
+        hips.setdefault(asset["hip"], []).append(asset)
+
+    failed = 0
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(publish_hip, hip, hip_assets): hip
+                   for hip, hip_assets in hips.items()}
+
+        for future in as_completed(futures):
+            hip = futures[future]
+            try:
+                results = future.result()
+
+            except Exception as e:
+                # The hip couldn't be loaded, all its assets failed
+                results = [(f"{hip}:{asset['node']}", str(e))
+                           for asset in hips[hip]]
+
+            for file_path, error in results:
+                total += 1
+                if error:
+                    failed += 1
+                    print(f"FAILED {file_path}: {error}")
+                else:
+                    print(f"Published {file_path}")
+
+    print(f"{total - failed}/{total} files published")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import hou # type: ignore
+import os
+
+import discordNotifier
+import driveConnections
+import flowConnections
+import houdiniPublisher
+import publishQueue
+import publishTrace
+
+
+_QUEUE = None
+
+
+def publish_queue():
+    """Gets the publish queue of the session, starting it the first time.
+
+    :return: The queue that uploads the exported assets at the background.
+    :rtype: publishQueue.PublishQueue
+    """
+
+    global _QUEUE
+
+    if _QUEUE is None:
+        _QUEUE = publishQueue.PublishQueue(upload_asset).start()
+
+    return _QUEUE
+
+
+def resume_queue():
+    """Starts the publish queue at the start of the session if there are
+    jobs left by a previous session, queued or interrupted by a crash.
+
+    :return: The queue if it was started, None without jobs to run.
+    :rtype: publishQueue.PublishQueue
+    """
+
+    if _QUEUE is None and not publishQueue.PublishQueue.pending():
+        return None
+
+    return publish_queue()
+
+
+def export_asset(background=True):
+    """Export the asset of the HDA and publish it at Google Drive, Flow and
+    Discord.
+
+    At the background mode only the export blocks Houdini, the publish is
+    queued and its end is notified at the status bar. Otherwise the files are
+    uploaded to Google Drive while the ROP writes them.
+
+    :param background: If the publish runs at the background.
+    """
+
+    hda = hou.pwd()
+    name = hda.parm("name").eval()
+    version = hda.parm("version").eval()
+    type = hda.parm("type").evalAsString()
+    out = hda.parm("out").eval()
+    project = hda.parm("project").evalAsString()
+
+    export = houdiniPublisher.Publisher(name, version, type, out)
+    job = {
+        "name": name,
+        "version": version,
+        "project": project,
+        "file_path": export.output_file(),
+    }
+    file_name = os.path.basename(job["file_path"])
+
+    # Several types like ".abc .usd .vdb" are exported at the same time
+    formats = hda.parm("formats")
+    types = formats.evalAsString().split() if formats else []
+
+    if len(types) > 1:
+        export_formats(export, job, types, background)
+
+        return
+
+    if background:
+        # Export asset to local disc and publish it at the background
+        with publishTrace.span("publish.export", summary=True, asset=file_name):
+            export.export_assets()
+
+        job_id = publish_queue().enqueue(job)
+        publishQueue.notify(f"Publishing {file_name} (job {job_id})...")
+
+        return
+
+    with publishTrace.span("publish", summary=True, asset=file_name):
+        # Export asset to local disc uploading it to Google Drive
+        g = driveConnections.GoogleDrive()
+        project_id = g.folder_project_id(project)
+        assets_folder_id = g.folder_assets_id(project_id, "assets")
+
+        with publishTrace.span("publish.export"):
+            file_id = export.export_streaming(g, assets_folder_id)
+
+        announce_asset(job, g.share_link(file_id))
+
+    # Houdini Notify
+    hou.ui.displayMessage("Asset published successfully!!")
+
+
+def export_formats(export, job, types, background=True):
+    """Export an asset at several types with a PDG local scheduler and
+    publish all the files exported.
+
+    :param export: houdiniPublisher.Publisher of the asset.
+    :param job: Dictionary with the name, version and project of the asset.
+    :param types: List of extensions like [".abc", ".usd", ".vdb"].
+    :param background: If the publish runs at the background.
+    """
+
+    with publishTrace.span("publish.export", summary=background,
+                           asset=job["name"], types=" ".join(types)):
+        outputs = export.export_formats(types)
+
+    jobs = [dict(job, file_path=path) for path in outputs.values()]
+
+    if background:
+        # One job for all the outputs, they are published together
+        job_id = publish_queue().enqueue({"jobs": jobs})
+        file_names = ", ".join(os.path.basename(output_job["file_path"])
+                               for output_job in jobs)
+        publishQueue.notify(f"Publishing {file_names} (job {job_id})...")
+
+        return
+
+    upload_asset({"jobs": jobs})
+
+    # Houdini Notify
+    hou.ui.displayMessage("Asset published successfully!!")
+
+
+def upload_asset(job):
+    """Upload an exported asset to Google Drive and publish it at Flow and
+    Discord.
+
+    :param job: Dictionary with the name, version, project and file_path of
+    the asset, or with "jobs", a list of them published together.
+    :raises driveConnections.UploadError: If some files failed to publish.
+    """
+
+    jobs = job.get("jobs", [job])
+    results = upload_assets(jobs)
+
+    failed = [(file_path, error) for file_path, error in results if error]
+    if failed:
+        raise driveConnections.UploadError(failed)
+
+    file_names = ", ".join(os.path.basename(file_path)
+                           for file_path, _ in results)
+    publishQueue.notify(f"{file_names} published successfully!!")
+
+
+def upload_assets(jobs):
+    """Upload several exported assets to Google Drive and publish them at
+    Flow and Discord, the links are shared with one batch and the versions
+    of each project are created with one Flow batch.
+
+    :param jobs: List of dictionaries with the name, version, project and
+    file_path of each asset.
+    :return: List of tuples with the asset file and the error or None.
+    :rtype: list
+    """
+
+    file_names = ", ".join(os.path.basename(job["file_path"]) for job in jobs)
+    errors = {}
+    file_ids = {}
+
+    with publishTrace.span("publish.job", summary=True, asset=file_names):
+        g = driveConnections.GoogleDrive()
+
+        with publishTrace.span("publish.upload"):
+            for index, job in enumerate(jobs):
+                try:
+                    file_ids[index] = upload_job_file(g, job)
+
+                except Exception as e:
+                    errors[index] = str(e)
+
+        links = {}
+        if file_ids:
+            try:
+                shared = g.share_links(list(file_ids.values()))
+                links = {index: shared[file_id]
+                         for index, file_id in file_ids.items()}
+
+            except Exception as e:
+                errors.update((index, str(e)) for index in file_ids)
+
+        if links:
+            try:
+                announce_assets([(jobs[index], link)
+                                 for index, link in links.items()])
+
+            except Exception as e:
+                errors.update((index, str(e)) for index in links)
+
+    # [("D:/assets/rock_v004.abc", None)]...
+    return [(job["file_path"], errors.get(index))
+            for index, job in enumerate(jobs)]
+
+
+def upload_job_file(drive, job):
+    """Upload the file or the folder of cache of an exported asset to the
+    assets folder of its project at Google Drive.
+
+    :param drive: driveConnections.GoogleDrive.
+    :param job: Dictionary with the name, version, project and file_path of
+    the asset.
+    :return: The id of the file or the folder uploaded.
+    :rtype: str
+    """
+
+    assets_folder_id = drive.resolve_folder(f"{job['project']}/assets")
+
+    if os.path.isdir(job["file_path"]):
+        previous_id = previous_version_id(drive, job, assets_folder_id)
+
+        return drive.upload_folder(job["file_path"], assets_folder_id,
+                                   previous_id=previous_id)
+
+    return drive.upload_file(job["file_path"], assets_folder_id)
+
+
+def announce_asset(job, asset_link):
+    """Publish the asset uploaded at Flow and notify it at Discord.
+
+    :param job: Dictionary with the name, version, project and file_path of
+    the asset.
+    :param asset_link: The link with the file are saved.
+    """
+
+    announce_assets([(job, asset_link)])
+
+
+def announce_assets(uploads):
+    """Publish several assets uploaded at Flow, with one call by project,
+    and notify each one at Discord.
+
+    :param uploads: List of tuples with the job of the asset and its link.
+    """
+
+    projects = {}
+    for job, asset_link in uploads:
+        projects.setdefault(job["project"], []).append(
+            (job["name"], job["version"], asset_link))
+
+    # Upload assets data to Flow
+    with publishTrace.span("publish.flow"):
+        flow_up = flowConnections.UploadToFlow()
+        for project, assets in projects.items():
+            flow_up.publish_assets(project, assets)
+
+    # Notify upload at Discord
+    notify = discordNotifier.DiscordConnections()
+
+    for job, _ in uploads:
+        file_name = os.path.basename(job["file_path"])
+        msg = notify.notify_asset_message(file_name)
+        notify.flipbok_notifier(msg)
+
+
+def previous_version_id(drive, job, parent_id):
+    """Gets the folder of the previous version of a cache at Google Drive,
+    for copy the files that didn't change instead of upload them.
+
+    :param drive: driveConnections.GoogleDrive.
+    :param job: Dictionary with the name and version of the asset.
+    :param parent_id: Id of the assets folder.
+    :return: The id of the folder or None if it doesn't exist.
+    :rtype: str
+    """
+
+    if job["version"] <= 1:
+        return None
+
+    folder_name = f"{job['name']}_v{job['version'] - 1:03d}"
+
+    try:
+        return drive.resolve_folder(folder_name, parent_id)
+
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,324 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import userPrefs
+
+
+def notify(message, error=False):
+    """Shows a message at the Houdini status bar without blocking the
+    artist, outside of the Houdini UI the message is printed.
+
+    :param message: Message to show.
+    :param error: If the message is an error.
+    """
+
+    try:
+        import hou # type: ignore
+        import hdefereval # type: ignore
+
+    except ImportError:
+        print(message)
+        return
+
+    if not hou.isUIAvailable():
+        print(message)
+        return
+
+    severity = hou.severityType.Error if error else hou.severityType.Message
+
+    # The Houdini UI only can be changed from the main thread
+    hdefereval.executeDeferred(
+        lambda: hou.ui.setStatusMessage(message, severity=severity))
+
+
+def process_alive(pid):
+    """Checks if a process of this machine is running.
+
+    :param pid: Id of the process.
+    :return: True if the process is running.
+    :rtype: bool
+    """
+
+    if pid == os.getpid():
+        return True
+
+    if os.name == "nt":
+        # os.kill terminates the process at Windows
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+
+        # STILL_ACTIVE
+        return code.value == 259
+
+    try:
+        os.kill(pid, 0)
+
+    except ProcessLookupError:
+        return False
+
+    except PermissionError:
+        return True
+
+    return True
+
+
+class PublishQueue:
+    """Queue of publish jobs saved at disk and run one by one by a
+    background thread, so the publish never blocks Houdini.
+
+    The database is shared by all the Houdini sessions of the user, each
+    running job saves its owner and a heartbeat. The jobs left running by a
+    crash, with the owner dead or the heartbeat stale, are queued again when
+    a queue starts.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    # Seconds between the heartbeats of the running jobs
+    HEARTBEAT_INTERVAL = 30
+    # Seconds without heartbeat for consider a running job orphan
+    STALE_AFTER = 120
+
+    def __init__(self, handler, path=None):
+        """
+        :param handler: Function called with the data of each job.
+        :param path: Path of the database file, by default inside the
+        Houdini user prefs directory.
+        """
+
+        self.handler = handler
+        self.path = path or self.default_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        # "render01:12345"
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._heartbeat = None
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   timeout=30)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                heartbeat REAL
+            );
+            """
+        )
+
+        # Databases created before the owner of the jobs was saved
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        with self._db:
+            for column, type in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {type}")
+
+    @staticmethod
+    def default_path():
+        """Gets the path of the database at the Houdini user prefs.
+
+        :return: Path like "C:/Users/User/Documents/houdini20.5/visualnoobs/publish.db"
+        :rtype: str
+        """
+
+        return userPrefs.pref_path("publish.db")
+
+    @classmethod
+    def pending(cls, path=None):
+        """Checks if a database has jobs to run, queued or left running by
+        a session, without creating it.
+
+        :param path: Path of the database file, by default inside the
+        Houdini user prefs directory.
+        :return: True if there are queued or running jobs.
+        :rtype: bool
+        """
+
+        path = path or cls.default_path()
+        if not os.path.exists(path):
+            return False
+
+        db = sqlite3.connect(path, timeout=30)
+        try:
+            row = db.execute(
+                "SELECT 1 FROM jobs WHERE status IN (?, ?) LIMIT 1",
+                (cls.QUEUED, cls.RUNNING),
+            ).fetchone()
+
+        except sqlite3.OperationalError:
+            # Database without the jobs table
+            return False
+
+        finally:
+            db.close()
+
+        return row is not None
+
+    def start(self):
+        """Starts the background thread that runs the jobs.
+
+        :return: The PublishQueue itself.
+        :rtype: PublishQueue
+        """
+
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        # Jobs interrupted by a crash, not the ones of other open sessions
+        self._requeue_orphans()
+
+        self._thread = threading.Thread(target=self._work, daemon=True,
+                                        name="PublishQueue")
+        self._thread.start()
+
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._beat, daemon=True,
+                                               name="PublishQueueHeartbeat")
+            self._heartbeat.start()
+
+        return self
+
+    def enqueue(self, data):
+        """Saves a job for run it at the background.
+
+        :param data: Dictionary serializable to json with the job data.
+        :return: The id of the job.
+        :rtype: int
+        """
+
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (status, data, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.QUEUED, json.dumps(data), now, now),
+            )
+
+        self._wake.set()
+
+        # 12
+        return cursor.lastrowid
+
+    def jobs(self, status=None):
+        """Gets the jobs of the queue.
+
+        :param status: Status of the jobs like "queued", None for all.
+        :return: List with a dictionary with the id, status, data and error
+        of each job.
+        :rtype: list
+        """
+
+        query = "SELECT id, status, data, error FROM jobs"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+
+        # [{"id": 12, "status": "done", "data": {...}, "error": None}]...
+        return [{"id": id, "status": status, "data": json.loads(data),
+                 "error": error} for id, status, data, error in rows]
+
+    def _work(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wake.wait(timeout=5)
+                self._wake.clear()
+                continue
+
+            try:
+                self.handler(job["data"])
+
+            except Exception as e:
+                self._update(job["id"], self.FAILED, error=str(e))
+                notify(f"Publish job {job['id']} failed: {e}", error=True)
+
+            else:
+                self._update(job["id"], self.DONE)
+
+    def _claim(self):
+        while True:
+            with self._lock, self._db:
+                row = self._db.execute(
+                    "SELECT id, data FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                    (self.QUEUED,),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                now = time.time()
+                # Another session could claim the job at the same time
+                claimed = self._db.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, "
+                    "updated_at = ? WHERE id = ? AND status = ?",
+                    (self.RUNNING, self.owner, now, now, row[0], self.QUEUED),
+                ).rowcount
+
+            if claimed:
+                return {"id": row[0], "data": json.loads(row[1])}
+
+    def _beat(self):
+        # Keeps alive the jobs running at this session
+        while True:
+            time.sleep(self.HEARTBEAT_INTERVAL)
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = ?",
+                    (time.time(), self.owner, self.RUNNING),
+                )
+
+    def _requeue_orphans(self):
+        host = socket.gethostname()
+        stale = time.time() - self.STALE_AFTER
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, owner, heartbeat FROM jobs WHERE status = ?",
+                (self.RUNNING,),
+            ).fetchall()
+
+        for id, owner, heartbeat in rows:
+            owner_host, _, pid = (owner or "").rpartition(":")
+            dead = (owner_host == host and pid.isdigit()
+                    and not process_alive(int(pid)))
+
+            if dead or heartbeat is None or heartbeat < stale:
+                with self._lock, self._db:
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? "
+                        "WHERE id = ? AND status = ? AND owner IS ?",
+                        (self.QUEUED, time.time(), id, self.RUNNING, owner),
+                    )
+
+    def _update(self, job_id, new_status, error=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (new_status, error, time.time(), job_id),
+            )
@@ -0,0 +1,331 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+import userPrefs
+
+
+# Set VN_TRACE=1 for trace the publish, VN_TRACE_FILE changes the log path
+_ENABLED = os.environ.get("VN_TRACE", "") not in ("", "0")
+_PATH = None
+_IDS = itertools.count(1)
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+class Span:
+    """Timed stage of the publish with the requests and bytes of its
+    external calls.
+    """
+
+    __slots__ = ("id", "name", "attrs", "parent", "root", "start", "seconds",
+                 "requests", "bytes", "records", "summary")
+
+    def __init__(self, name, attrs, parent, summary):
+        self.id = next(_IDS)
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.root = parent.root if parent else self
+        self.start = time.time()
+        self.seconds = 0.0
+        self.requests = 0
+        self.bytes = 0
+        self.records = []
+        self.summary = summary
+
+    def add(self, requests=0, bytes=0):
+        """Counts requests and bytes sent or received by the span.
+
+        :param requests: Number of requests.
+        :param bytes: Number of bytes.
+        """
+
+        self.requests += requests
+        self.bytes += bytes
+
+    def __enter__(self):
+        _stack().append(self)
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.time() - self.start
+        _stack().pop()
+
+        record = {
+            "id": self.id,
+            "parent": self.parent.id if self.parent else None,
+            "name": self.name,
+            "thread": threading.current_thread().name,
+            "start": self.start,
+            "seconds": self.seconds,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "error": repr(exc) if exc else None,
+        }
+        record.update(self.attrs)
+        _write(record)
+
+        with _LOCK:
+            self.root.records.append(record)
+
+        if self.summary:
+            print(summary(self.records))
+
+        return False
+
+
+class _NoSpan:
+    """Span used when the trace is disabled, it does nothing."""
+
+    __slots__ = ()
+
+    def add(self, requests=0, bytes=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def enable(path=None):
+    """Enables the trace for the rest of the session.
+
+    :param path: Path of the jsonl log, by default inside the Houdini user
+    prefs directory.
+    """
+
+    global _ENABLED, _PATH
+
+    _ENABLED = True
+    _PATH = path
+
+
+def disable():
+    """Disables the trace."""
+
+    global _ENABLED
+
+    _ENABLED = False
+
+
+def span(name, summary=False, **attrs):
+    """Creates a span for time a stage of the publish, used as context
+    manager. The spans inside it are its children.
+
+    :param name: Name of the stage like "drive.upload_file".
+    :param summary: If a summary of the span and its children is printed
+    when it ends.
+    :param attrs: Extra data saved with the span.
+    :return: The span, or a span that does nothing if the trace is disabled.
+    :rtype: Span
+    """
+
+    if not _ENABLED:
+        return _NO_SPAN
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+
+    return Span(name, attrs, parent, summary)
+
+
+def current():
+    """Gets the span running at the current thread, for pass it to the
+    worker threads.
+
+    :return: The span or None if there isn't one.
+    :rtype: Span
+    """
+
+    if not _ENABLED:
+        return None
+
+    stack = _stack()
+
+    return stack[-1] if stack else None
+
+
+class attach:
+    """Context manager that runs the spans of a worker thread as children of
+    a span of another thread.
+    """
+
+    __slots__ = ("parent",)
+
+    def __init__(self, parent):
+        """
+        :param parent: Span from current() at the thread that sent the work.
+        """
+
+        self.parent = parent
+
+    def __enter__(self):
+        if self.parent is not None:
+            _stack().append(self.parent)
+
+        return self.parent
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.parent is not None:
+            _stack().pop()
+
+        return False
+
+
+def wrap(function, parent=None):
+    """Wraps a function submitted to a worker thread, so its spans belong
+    to the span that submitted it.
+
+    :param function: Function to run at the worker thread.
+    :param parent: Span of the work, by default the current span.
+    :return: The function wrapped, or the function itself without span.
+    """
+
+    parent = parent or current()
+    if parent is None:
+        return function
+
+    def run(*args, **kwargs):
+        with attach(parent):
+            return function(*args, **kwargs)
+
+    return run
+
+
+def add(requests=0, bytes=0):
+    """Counts requests and bytes at the current span of the thread.
+
+    :param requests: Number of requests.
+    :param bytes: Number of bytes.
+    """
+
+    if not _ENABLED:
+        return
+
+    stack = _stack()
+    if stack:
+        stack[-1].add(requests, bytes)
+
+
+def json_size(value):
+    """Gets the bytes of a value sent or received as json by an API, an
+    estimation of the body size without the http headers.
+
+    :param value: Value like the arguments or the response of a request.
+    :return: Number of bytes, 0 if the trace is disabled.
+    :rtype: int
+    """
+
+    if not _ENABLED or value is None:
+        return 0
+
+    if isinstance(value, (bytes, str)):
+        return len(value)
+
+    return len(json.dumps(value, default=str))
+
+
+def request_size(request):
+    """Gets the bytes of the url and the body of a request of the Google
+    API client.
+
+    :param request: googleapiclient.http.HttpRequest.
+    :return: Number of bytes, 0 if the trace is disabled.
+    :rtype: int
+    """
+
+    return (json_size(getattr(request, "uri", None))
+            + json_size(getattr(request, "body", None)))
+
+
+def summary(records):
+    """Creates a table with the time, requests and bytes of each stage.
+
+    :param records: List with the records of the spans.
+    :return: The table.
+    :rtype: str
+    """
+
+    stages = {}
+    for record in records:
+        stage = stages.setdefault(record["name"], [0, 0.0, 0, 0])
+        stage[0] += 1
+        stage[1] += record["seconds"]
+        stage[2] += record["requests"]
+        stage[3] += record["bytes"]
+
+    lines = [f"{'stage':<28}{'calls':>7}{'seconds':>10}{'requests':>10}{'MB':>10}"]
+    for name, (calls, seconds, requests, bytes) in sorted(
+            stages.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<28}{calls:>7}{seconds:>10.2f}{requests:>10}"
+                     f"{bytes / 1024 / 1024:>10.1f}")
+
+    return "\n".join(lines)
+
+
+class _TracedClient:
+    """Client of an external service that traces each method called."""
+
+    __slots__ = ("_client", "_prefix")
+
+    def __init__(self, client, prefix):
+        self._client = client
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            # The first argument of the Flow calls is the entity type
+            entity = args[0] if args and isinstance(args[0], str) else None
+            with span(f"{self._prefix}.{name}", entity=entity) as s:
+                s.add(requests=1, bytes=json_size([args, kwargs]))
+                result = attr(*args, **kwargs)
+                s.add(bytes=json_size(result))
+                return result
+
+        return call
+
+
+def traced(client, prefix):
+    """Wraps a client for trace each method called as a request.
+
+    :param client: Client like a shotgun_api3.Shotgun.
+    :param prefix: Prefix of the span names like "flow".
+    :return: The client wrapped, or the client itself if the trace is
+    disabled.
+    """
+
+    if not _ENABLED:
+        return client
+
+    return _TracedClient(client, prefix)
+
+
+def _stack():
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+
+    return stack
+
+
+def _write(record):
+    path = (_PATH or os.environ.get("VN_TRACE_FILE")
+            or userPrefs.pref_path("trace.jsonl"))
+
+    with _LOCK:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
@@ -0,0 +1,15 @@
+import os
+
+
+def pref_path(file_name):
+    """Gets the path of a file of the publisher saved at the Houdini user
+    prefs, like the databases of the store, the queue and the uploads.
+
+    :param file_name: Name of the file.
+    :return: Path like "C:/Users/User/Documents/houdini20.5/visualnoobs/publish.db"
+    :rtype: str
+    """
+
+    prefs = os.environ.get("HOUDINI_USER_PREF_DIR", os.path.expanduser("~"))
+
+    return os.path.join(prefs, "visualnoobs", file_name)